@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+本地模拟服务
+Fake Upstream Servers - 基准测试使用的模拟证券业协会网站和PDF源站
+
+- FakeSACServer: 查询页面 sac-publicity-name.html 和
+  /publicity/getPersonListByName、/publicity/getPersonDetail 接口，
+  响应延迟和人员数量按配置的分布随机生成（同一姓名每次返回相同的人员列表）
+- FakePDFOrigin: /pdf/<字节数>/<任意名称>.pdf 返回指定大小的PDF文件，
+  支持 ETag / Last-Modified 条件请求（304），可限制发送速度
+
+单独运行:
+    python benchmarks/fake_servers.py --sac-port 9100 --pdf-port 9200
+    SAC_BASE_URL=http://127.0.0.1:9100 python src/app.py
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+LANDING_PATH = '/pages/registration/sac-publicity-name.html'
+LIST_PATH = '/publicity/getPersonListByName'
+DETAIL_PATH = '/publicity/getPersonDetail'
+
+LANDING_PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>从业人员信息公示（模拟）</title></head>
+<body><h1>从业人员信息公示（本地模拟服务）</h1></body>
+</html>
+"""
+
+ORG_NAMES = [
+    '中国国际金融股份有限公司', '民生证券股份有限公司', '方正证券股份有限公司',
+    '东方证券股份有限公司', '华西证券股份有限公司', '中信证券股份有限公司',
+]
+PRAC_CATEGORIES = ['一般证券业务', '证券投资咨询业务(分析师)', '证券投资咨询业务(投资顾问)', '保荐代表人']
+
+CHUNK_SIZE = 64 * 1024
+# 文件修改时间固定，条件请求可以命中
+LAST_MODIFIED = formatdate(1700000000, usegmt=True)
+
+
+def parse_size(value: str) -> int:
+    """解析字节数，支持 k / m / g 后缀（如 512k、2m）"""
+    value = value.strip().lower()
+    units = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def parse_distribution(spec: str, parse=int) -> List[Tuple[object, float]]:
+    """
+    解析带权重的离散分布
+
+    Args:
+        spec: 形如 "1:40,3:30,10:20,50:10"（值:权重），权重可省略（默认1）
+        parse: 值的解析函数
+    """
+    items = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        value, _, weight = part.partition(':')
+        items.append((parse(value), float(weight) if weight else 1.0))
+    if not items:
+        raise ValueError(f"分布为空: {spec!r}")
+    return items
+
+
+def choose(distribution: List[Tuple[object, float]], rng: random.Random):
+    """按权重随机选取一个值"""
+    values, weights = zip(*distribution)
+    return rng.choices(values, weights=weights)[0]
+
+
+def seeded_random(*parts) -> random.Random:
+    """由参数确定的随机数生成器（相同参数得到相同序列）"""
+    digest = hashlib.sha1('|'.join(map(str, parts)).encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+class LatencyModel:
+    """对数正态分布的响应延迟"""
+
+    def __init__(self, median_ms: float, sigma: float = 0.0):
+        """
+        Args:
+            median_ms: 延迟中位数（毫秒）
+            sigma: 对数标准差，0 表示固定延迟；0.5 时约 5% 的请求超过中位数的 2.3 倍
+        """
+        self.median_ms = max(median_ms, 0.0)
+        self.sigma = max(sigma, 0.0)
+
+    def sample(self) -> float:
+        """抽取一次延迟（秒）"""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(self.sigma * random.gauss(0, 1)) / 1000.0
+
+    def sleep(self):
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+    def describe(self) -> Dict:
+        return {'median_ms': self.median_ms, 'sigma': self.sigma}
+
+
+class _Server:
+    """在后台线程中运行的 HTTP 服务"""
+
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._requests = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """启动服务（port 为 0 时自动分配端口）"""
+        handler = type(self.handler_class.__name__, (self.handler_class,), {'server_state': self})
+        self.httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def count(self, key: str):
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def stats(self) -> Dict:
+        """各路径收到的请求数"""
+        with self._lock:
+            return dict(self._requests)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_state = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_json(self, data: Dict, status: int = 200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_body(status, body, 'application/json;charset=UTF-8')
+
+
+class _SACHandler(_Handler):
+
+    def do_GET(self):
+        state = self.server_state
+        path = urlparse(self.path).path
+        state.count(path)
+        if path == LANDING_PATH:
+            self.send_body(200, LANDING_PAGE.encode('utf-8'), 'text/html;charset=UTF-8',
+                           {'Set-Cookie': 'acw_tc=benchmark; Path=/'})
+        else:
+            self.send_body(404, b'not found', 'text/plain')
+
+    def do_POST(self):
+        state = self.server_state
+        path = urlparse(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        params = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+        state.count(path)
+
+        if path == LIST_PATH:
+            state.latency.sleep()
+            self.send_json(state.person_list(params.get('name', '')))
+        elif path == DETAIL_PATH:
+            state.latency.sleep()
+            self.send_json(state.person_detail(params.get('uuid', '')))
+        else:
+            self.send_body(404, b'not found', 'text/plain')
+
+
+class FakeSACServer(_Server):
+    """模拟证券业协会从业人员查询网站"""
+
+    handler_class = _SACHandler
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: Optional[LatencyModel] = None, results: str = '1:40,3:30,10:20,50:10'):
+        """
+        Args:
+            latency: 接口响应延迟
+            results: 每个姓名的人员数量分布（值:权重）
+        """
+        super().__init__(host, port)
+        self.latency = latency or LatencyModel(200, 0.5)
+        self.results = parse_distribution(results)
+        self._names = {}
+
+    def _person(self, name: str, uuid: str, rng: random.Random) -> Dict:
+        org_index = rng.randrange(len(ORG_NAMES))
+        return {
+            'name': name,
+            'uuid': uuid,
+            'gender': rng.choice(['男', '女']),
+            'edu': rng.choice(['本科', '硕士研究生', '博士研究生']),
+            'orgId': str(1999000 + org_index),
+            'orgName': ORG_NAMES[org_index],
+            'pracCtegCode': '0',
+            'pracCtegName': rng.choice(PRAC_CATEGORIES),
+            'pracAreaName': None,
+            'certifNo': f"S{rng.randrange(10 ** 13):013d}",
+            'regDate': f"{rng.randint(2005, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'regCnt': rng.randint(1, 3),
+        }
+
+    def person_list(self, name: str) -> Dict:
+        """同一姓名总是返回相同的人员列表"""
+        rng = seeded_random('list', name)
+        total = choose(self.results, rng)
+        persons = []
+        for index in range(total):
+            uuid = str(1614059641131000000 + rng.randrange(10 ** 6) * 100 + index)
+            with self._lock:
+                self._names[uuid] = name
+            persons.append(self._person(name, uuid, seeded_random('person', uuid)))
+        return {'code': 20000, 'message': '成功', 'success': True, 'data': {'data': persons}}
+
+    def person_detail(self, uuid: str) -> Dict:
+        """任意UUID都返回确定的详情（未在列表中出现过的使用占位姓名）"""
+        with self._lock:
+            name = self._names.get(uuid, '测试')
+        rng = seeded_random('person', uuid)
+        person = self._person(name, uuid, rng)
+        person['regHistory'] = json.dumps([{
+            'certif_no': person['certifNo'], 'status': '正常', 'get_date': person['regDate'],
+            'leave_date': '', 'org_name': person['orgName'], 'reg_type': person['pracCtegName'],
+        }], ensure_ascii=False)
+        return {'code': 20000, 'message': '成功', 'success': True, 'data': {'data': person}}
+
+    def describe(self) -> Dict:
+        return {'url': self.url, 'latency': self.latency.describe(),
+                'results': [list(item) for item in self.results]}
+
+
+class _PDFHandler(_Handler):
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        state = self.server_state
+        parts = urlparse(self.path).path.strip('/').split('/')
+        state.count('/pdf')
+        try:
+            if len(parts) < 2 or parts[0] != 'pdf':
+                raise ValueError
+            size = parse_size(parts[1])
+        except ValueError:
+            self.send_body(404, b'not found', 'text/plain')
+            return
+
+        etag = '"%s"' % hashlib.sha1(self.path.encode('utf-8')).hexdigest()[:16]
+        state.latency.sleep()
+        if self.headers.get('If-None-Match') == etag or self.headers.get('If-Modified-Since') == LAST_MODIFIED:
+            state.count('/pdf 304')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        size = max(size, len(state.header))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(size))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', LAST_MODIFIED)
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+
+        started = time.perf_counter()
+        sent = 0
+        first = state.header + state.filler[len(state.header):]
+        while sent < size:
+            chunk = (state.filler if sent else first)[:min(CHUNK_SIZE, size - sent)]
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if state.bandwidth > 0:
+                ahead = sent / state.bandwidth - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+class FakePDFOrigin(_Server):
+    """模拟PDF源站：/pdf/<字节数>/<名称>.pdf"""
+
+    handler_class = _PDFHandler
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: Optional[LatencyModel] = None, bandwidth: int = 0):
+        """
+        Args:
+            latency: 首字节延迟
+            bandwidth: 每个连接的发送速度（字节/秒），0 表示不限制
+        """
+        super().__init__(host, port)
+        self.latency = latency or LatencyModel(50, 0.3)
+        self.bandwidth = bandwidth
+        self.header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+        self.filler = bytes(random.Random(0).getrandbits(8) for _ in range(CHUNK_SIZE))
+
+    def pdf_url(self, size: int, name: str) -> str:
+        return f"{self.url}/pdf/{size}/{name}.pdf"
+
+    def describe(self) -> Dict:
+        return {'url': self.url, 'latency': self.latency.describe(), 'bandwidth': self.bandwidth}
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """模拟服务的命令行参数（基准测试脚本共用）"""
+    group = parser.add_argument_group('模拟服务')
+    group.add_argument('--sac-port', type=int, default=0, help='模拟SAC网站端口（默认自动分配）')
+    group.add_argument('--sac-latency-ms', type=float, default=200, help='SAC接口延迟中位数（毫秒）')
+    group.add_argument('--sac-latency-sigma', type=float, default=0.5, help='SAC接口延迟的对数标准差')
+    group.add_argument('--sac-results', default='1:40,3:30,10:20,50:10',
+                       help='每个姓名的人员数量分布（值:权重）')
+    group.add_argument('--pdf-port', type=int, default=0, help='模拟PDF源站端口（默认自动分配）')
+    group.add_argument('--pdf-latency-ms', type=float, default=50, help='PDF源站首字节延迟中位数（毫秒）')
+    group.add_argument('--pdf-latency-sigma', type=float, default=0.3, help='PDF源站延迟的对数标准差')
+    group.add_argument('--pdf-bandwidth', type=parse_size, default=0,
+                       help='PDF源站每个连接的发送速度（字节/秒，支持k/m后缀），0 表示不限制')
+
+
+def start_servers(args) -> Tuple[FakeSACServer, FakePDFOrigin]:
+    """按命令行参数启动模拟服务"""
+    sac = FakeSACServer(
+        port=args.sac_port,
+        latency=LatencyModel(args.sac_latency_ms, args.sac_latency_sigma),
+        results=args.sac_results
+    ).start()
+    pdf = FakePDFOrigin(
+        port=args.pdf_port,
+        latency=LatencyModel(args.pdf_latency_ms, args.pdf_latency_sigma),
+        bandwidth=args.pdf_bandwidth
+    ).start()
+    return sac, pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动本地模拟SAC网站和PDF源站')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    sac, pdf = start_servers(args)
+    print(f"模拟SAC网站: {sac.url}  （SAC_BASE_URL={sac.url}）")
+    print(f"模拟PDF源站: {pdf.url}  （示例: {pdf.pdf_url(1024 * 1024, 'example')}）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sac.stop()
+        pdf.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+离线基准测试
+Offline Benchmark - 使用本地模拟服务测量各接口的吞吐量和延迟
+
+启动模拟SAC网站和PDF源站，（可选）以指向模拟服务的配置启动本服务，
+然后在多个并发级别下对每个接口发送固定数量的请求（闭环：每个并发连接收到响应后立即发送下一个），
+统计吞吐量和 p50 / p95 / p99 延迟，结果保存为JSON，便于不同版本之间比较。
+
+示例:
+    # 启动开发服务器并测试（默认）
+    python benchmarks/run_benchmark.py --concurrency 1,4,16 --requests 100
+
+    # 测试 gunicorn / uvicorn 部署
+    python benchmarks/run_benchmark.py --server gunicorn
+    python benchmarks/run_benchmark.py --server asgi
+
+    # 与之前的结果比较
+    python benchmarks/run_benchmark.py --compare benchmarks/results/20250101-120000.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid as uuid_lib
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+import fake_servers
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 与负载测试共用统计函数
+sys.path.insert(0, os.path.join(ROOT_DIR, 'tests'))
+from common import percentile
+
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+ENDPOINTS = ('health', 'search', 'detail', 'full', 'pdf')
+
+# 启动本服务的命令
+SERVER_COMMANDS = {
+    'dev': [sys.executable, 'src/app.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--app-dir', 'src', '--host', '127.0.0.1', '--port', '{port}'],
+}
+
+
+def summarize_latency(latencies: List[float]) -> Dict:
+    """延迟统计（毫秒）"""
+    values = sorted(latency * 1000 for latency in latencies)
+    if not values:
+        return {}
+    return {
+        'p50': round(percentile(values, 50), 2),
+        'p95': round(percentile(values, 95), 2),
+        'p99': round(percentile(values, 99), 2),
+        'mean': round(sum(values) / len(values), 2),
+        'min': round(values[0], 2),
+        'max': round(values[-1], 2),
+    }
+
+
+class RequestFactory:
+    """生成各接口的请求，key_space 控制不同的查询参数数量（决定缓存命中率）"""
+
+    def __init__(self, pdf_origin: fake_servers.FakePDFOrigin, key_space: int, pdf_sizes: str, run_id: str):
+        """
+        Args:
+            pdf_origin: 模拟PDF源站
+            key_space: 不同姓名 / UUID / PDF的数量，0 表示每个请求都不同（全部未命中缓存）
+            pdf_sizes: PDF文件大小分布（值:权重，支持k/m后缀）
+            run_id: 本次运行的标识，避免与之前运行的缓存结果重复
+        """
+        self.pdf_origin = pdf_origin
+        self.key_space = key_space
+        self.pdf_sizes = fake_servers.parse_distribution(pdf_sizes, fake_servers.parse_size)
+        self.run_id = run_id
+
+    def _key(self, index: int) -> int:
+        return index % self.key_space if self.key_space > 0 else index
+
+    def build(self, endpoint: str, scenario: str, index: int) -> Tuple[str, str, Dict]:
+        """返回 (method, path, params)"""
+        key = self._key(index)
+        tag = f"{self.run_id}{scenario}{key}"
+        if endpoint == 'health':
+            return 'GET', '/health', {}
+        if endpoint == 'search':
+            return 'GET', '/api/sac/search', {'name': f"基准{tag}"}
+        if endpoint == 'detail':
+            digits = int(uuid_lib.uuid5(uuid_lib.NAMESPACE_URL, tag).hex[:12], 16)
+            return 'GET', '/api/sac/detail', {'uuid': str(digits)}
+        if endpoint == 'full':
+            return 'GET', '/api/sac/full', {'name': f"基准{tag}"}
+        if endpoint == 'pdf':
+            size = fake_servers.choose(self.pdf_sizes, fake_servers.seeded_random('pdf', tag))
+            return 'GET', '/api/pdf/download', {'url': self.pdf_origin.pdf_url(size, tag)}
+        raise ValueError(f"未知接口: {endpoint}")
+
+
+def run_scenario(base_url: str, build: Callable[[int], Tuple[str, str, Dict]],
+                 concurrency: int, total: int, timeout: float) -> Dict:
+    """
+    以固定并发数发送 total 个请求（闭环）
+
+    Returns:
+        请求数、成功数、错误分类、耗时、吞吐量和延迟统计
+    """
+    lock = threading.Lock()
+    state = {'next': 0}
+    latencies = []
+    errors = Counter()
+    statuses = Counter()
+    received = [0]
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                index = state['next']
+                if index >= total:
+                    break
+                state['next'] += 1
+            method, path, params = build(index)
+            started = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, params=params, timeout=timeout)
+                size = len(response.content)
+                elapsed = time.perf_counter() - started
+                ok = response.status_code == 200
+                with lock:
+                    statuses[response.status_code] += 1
+                    if ok:
+                        latencies.append(elapsed)
+                        received[0] += size
+                    else:
+                        errors[f"HTTP {response.status_code}"] += 1
+            except requests.RequestException as e:
+                with lock:
+                    errors[type(e).__name__] += 1
+        session.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    return {
+        'requests': total,
+        'ok': len(latencies),
+        'errors': dict(errors),
+        'status': {str(code): count for code, count in sorted(statuses.items())},
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(latencies) / duration, 2) if duration > 0 else 0.0,
+        'received_bytes': received[0],
+        'latency_ms': summarize_latency(latencies),
+    }
+
+
+def wait_for_health(base_url: str, timeout: float, process: Optional[subprocess.Popen] = None):
+    """等待服务启动（健康检查返回200）"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"服务启动失败（退出码 {process.returncode}）")
+        try:
+            if requests.get(f"{base_url}/health", timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(1)
+    raise RuntimeError(f"等待服务启动超时（{timeout}秒）")
+
+
+def start_service(args, sac: fake_servers.FakeSACServer, workdir: str) -> subprocess.Popen:
+    """以指向模拟服务的配置启动本服务"""
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(args.port),
+        'SAC_BASE_URL': sac.url,
+        # 上游是本地模拟服务，不需要限速；缓存和批量目录放在临时目录中，每次运行从空缓存开始
+        'SAC_RATE': '1000',
+        'SAC_BURST': '1000',
+        'SAC_STORE_PATH': '',
+        'SAC_BATCH_DIR': os.path.join(workdir, 'batches'),
+        'PDF_CACHE_DIR': os.path.join(workdir, 'pdf_cache'),
+    })
+    for item in args.server_env:
+        key, _, value = item.partition('=')
+        env[key] = value
+
+    command = [part.format(port=args.port) for part in SERVER_COMMANDS[args.server]]
+    log = open(os.path.join(workdir, 'server.log'), 'wb')
+    print(f"启动服务: {' '.join(command)}（日志: {log.name}）")
+    return subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop_service(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: List[Dict]):
+    print(f"\n{'接口':<8}{'并发':>6}{'成功/总数':>12}{'吞吐(req/s)':>14}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}  错误")
+    for item in results:
+        latency = item['latency_ms']
+        print(f"{item['endpoint']:<8}{item['concurrency']:>6}{item['ok']:>7}/{item['requests']:<5}"
+              f"{item['throughput_rps']:>13}{latency.get('p50', '-'):>10}{latency.get('p95', '-'):>10}"
+              f"{latency.get('p99', '-'):>10}  {item['errors'] or ''}")
+
+
+def print_comparison(results: List[Dict], baseline_path: str):
+    """与之前保存的结果比较吞吐量和 p95 延迟"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(item['endpoint'], item['concurrency']): item for item in json.load(f)['results']}
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else '-'
+
+    print(f"\n与 {baseline_path} 比较:")
+    print(f"{'接口':<8}{'并发':>6}{'吞吐':>22}{'p95(ms)':>24}")
+    for item in results:
+        old = baseline.get((item['endpoint'], item['concurrency']))
+        if old is None:
+            continue
+        new_p95, old_p95 = item['latency_ms'].get('p95', 0), old['latency_ms'].get('p95', 0)
+        print(f"{item['endpoint']:<8}{item['concurrency']:>6}"
+              f"{old['throughput_rps']:>9} -> {item['throughput_rps']:<6}{change(item['throughput_rps'], old['throughput_rps']):>7}"
+              f"{old_p95:>11} -> {new_p95:<6}{change(new_p95, old_p95):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='使用本地模拟服务测量各接口的吞吐量和延迟')
+    parser.add_argument('--server', choices=sorted(SERVER_COMMANDS) + ['none'], default='dev',
+                        help='启动本服务的方式，none 表示测试已在运行的服务（需自行设置 SAC_BASE_URL）')
+    parser.add_argument('--base-url', help='已在运行的服务地址（--server none 时使用）')
+    parser.add_argument('--port', type=int, default=18888, help='启动本服务使用的端口')
+    parser.add_argument('--server-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='传给本服务的环境变量（可重复）')
+    parser.add_argument('--startup-timeout', type=float, default=180, help='等待服务启动的时间（秒）')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help=f"测试的接口（{','.join(ENDPOINTS)}）")
+    parser.add_argument('--concurrency', default='1,4,16', help='并发级别，逗号分隔')
+    parser.add_argument('--requests', type=int, default=50, help='每个并发级别发送的请求数')
+    parser.add_argument('--key-space', type=int, default=0,
+                        help='不同查询参数的数量，0 表示每个请求都不同（测量未命中缓存的路径）')
+    parser.add_argument('--pdf-sizes', default='100k:50,1m:40,10m:10', help='PDF文件大小分布（值:权重）')
+    parser.add_argument('--timeout', type=float, default=300, help='单个请求的超时时间（秒）')
+    parser.add_argument('--output', help='结果文件路径（默认 benchmarks/results/<时间>.json）')
+    parser.add_argument('--compare', help='与之前保存的结果文件比较')
+    fake_servers.add_arguments(parser)
+    args = parser.parse_args()
+
+    endpoints = [item.strip() for item in args.endpoints.split(',') if item.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"未知接口: {', '.join(sorted(unknown))}")
+    levels = [int(item) for item in args.concurrency.split(',') if item.strip()]
+    if args.server == 'none' and not args.base_url:
+        parser.error('--server none 时需要指定 --base-url')
+
+    sac, pdf = fake_servers.start_servers(args)
+    print(f"模拟SAC网站: {sac.url}，模拟PDF源站: {pdf.url}")
+
+    workdir = tempfile.mkdtemp(prefix='sac-benchmark-')
+    process = None
+    base_url = args.base_url.rstrip('/') if args.base_url else f"http://127.0.0.1:{args.port}"
+    run_id = uuid_lib.uuid4().hex[:6]
+    factory = RequestFactory(pdf, args.key_space, args.pdf_sizes, run_id)
+    results = []
+
+    try:
+        if args.server != 'none':
+            process = start_service(args, sac, workdir)
+        wait_for_health(base_url, args.startup_timeout, process)
+
+        for endpoint in endpoints:
+            for concurrency in levels:
+                scenario = f"c{concurrency}"
+                upstream_before = {**sac.stats(), **pdf.stats()}
+                print(f"测试 {endpoint}，并发 {concurrency}，请求 {args.requests} 个...")
+                result = run_scenario(
+                    base_url,
+                    lambda index: factory.build(endpoint, scenario, index),
+                    concurrency, args.requests, args.timeout
+                )
+                upstream_after = {**sac.stats(), **pdf.stats()}
+                result = {
+                    'endpoint': endpoint,
+                    'concurrency': concurrency,
+                    **result,
+                    'upstream_requests': {
+                        path: count - upstream_before.get(path, 0)
+                        for path, count in upstream_after.items()
+                        if count != upstream_before.get(path, 0)
+                    },
+                }
+                results.append(result)
+    finally:
+        if process is not None:
+            stop_service(process)
+        sac.stop()
+        pdf.stop()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'server': args.server,
+            'base_url': base_url,
+            'server_env': args.server_env,
+            'requests_per_level': args.requests,
+            'key_space': args.key_space,
+            'pdf_sizes': args.pdf_sizes,
+            'fake_sac': sac.describe(),
+            'fake_pdf': pdf.describe(),
+        },
+        'results': results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_results(results)
+    print(f"\n结果已保存到: {output}")
+    if args.compare:
+        print_comparison(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+gunicorn 配置
+Production Server Config - gthread 工作模式
+
+    gunicorn -c gunicorn.conf.py
+
+- 每个工作进程有独立的浏览器池、缓存和限速令牌桶；浏览器在 fork 之后才创建
+  （不要开启 preload_app，否则数据库连接和线程会在 fork 前创建）
+- 异步任务状态写入 SAC_JOB_DIR，轮询请求可以由任意工作进程处理
+- 查询请求大部分时间在等待浏览器和上游响应，使用线程处理并发请求
+- 平滑重启（HUP）或停止（TERM）时，工作进程先处理完正在执行的请求，
+  再等待已提交的异步任务完成并关闭浏览器
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+wsgi_app = 'wsgi:app'
+pythonpath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+# 工作进程：每个进程各自启动 SAC_POOL_SIZE + PDF_POOL_SIZE 个浏览器，进程数按内存确定
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# 长连接与超时（gthread 模式下 timeout 只用于检测卡死的工作进程，不限制单个请求时长）
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 120))
+
+# 定期重启工作进程，回收长时间运行的浏览器占用的内存（0 表示不重启）
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = False
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    """主进程启动时解析一次ChromeDriver路径并写入磁盘记录，工作进程直接使用"""
+    from utils.chromedriver import resolve_chromedriver
+    resolve_chromedriver()
+
+
+def post_worker_init(worker):
+    """工作进程加载应用后初始化浏览器池并恢复批量查询"""
+    from app import startup
+    startup()
+
+
+def worker_exit(server, worker):
+    """工作进程退出前（正在执行的请求已完成）等待异步任务并关闭浏览器"""
+    from app import cleanup
+    cleanup(drain=True)
@@ -6,16 +6,33 @@ Unified HTTP Service - Securities Query & PDF Download
 
 import os
 import sys
+import json
 import time
 import logging
-from flask import Flask, request, jsonify, Response
+import threading
+from flask import Flask, request, jsonify, Response, send_file, g
 from urllib.parse import urlparse, unquote
 
 # 添加src目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from services.sac_service import SACPersonAPI
-from services.pdf_service import download_pdf_with_chrome
+from services.sac_service import SACPersonAPI, SACSessionError, DEFAULT_BASE_URL
+from services.sac_cache import SACResultCache
+from services.sac_jobs import JobManager
+from services.sac_batch import BatchManager, parse_names_csv
+from services.pdf_service import (
+    download_pdf, revalidate_pdf, get_driver_pool, close_driver_pool, driver_pool_stats, download_stats,
+    PDF_POOL_SIZE
+)
+from services.pdf_cache import PDFCache, normalize_url
+from utils.pool import ResourcePool, PoolTimeoutError
+from utils.rate_limit import TokenBucket
+from utils.admission import AdmissionController, AdmissionRejected
+from utils import metrics, timing
+from utils.store import ResultStore
+from utils.cache import CACHE_MISS
+from utils.singleflight import SingleFlight
+from utils.chromedriver import resolve_chromedriver
 
 # 配置日志
 logging.basicConfig(
@@ -27,17 +44,347 @@ logger = logging.getLogger(__name__)
 # 创建Flask应用
 app = Flask(__name__)
 
-# 全局SAC API客户端（避免频繁创建和关闭浏览器）
-sac_client = None
+# SAC客户端池配置
+SAC_BASE_URL = os.environ.get('SAC_BASE_URL', DEFAULT_BASE_URL)  # 官网地址（基准测试时指向本地模拟服务）
+SAC_POOL_SIZE = int(os.environ.get('SAC_POOL_SIZE', 2))  # 浏览器会话数量
+SAC_POOL_TIMEOUT = float(os.environ.get('SAC_POOL_TIMEOUT', 60))  # 等待空闲会话的超时时间（秒）
+SAC_POOL_VALIDATE_IDLE = float(os.environ.get('SAC_POOL_VALIDATE_IDLE', 30))  # 空闲超过该时间的会话借出前检查存活（秒）
+SAC_TRANSPORT = os.environ.get('SAC_TRANSPORT', 'http')  # 请求通道: http（cookie直连）或 browser
+SAC_DETAIL_CONCURRENCY = int(os.environ.get('SAC_DETAIL_CONCURRENCY', 4))  # 完整查询时并发获取详情的请求数
+SAC_RATE = float(os.environ.get('SAC_RATE', 0.5))  # 上游请求速率（每秒请求数，所有会话共享）
+SAC_BURST = int(os.environ.get('SAC_BURST', 1))  # 允许的突发请求数
+
+# 查询结果缓存配置
+SAC_CACHE_LIST_TTL = float(os.environ.get('SAC_CACHE_LIST_TTL', 3600))  # 人员列表缓存时间（秒）
+SAC_CACHE_DETAIL_TTL = float(os.environ.get('SAC_CACHE_DETAIL_TTL', 86400))  # 人员详情缓存时间（秒）
+SAC_CACHE_STALE_TTL = float(os.environ.get('SAC_CACHE_STALE_TTL', 86400))  # 过期后仍可使用旧值的时间（秒）
+SAC_CACHE_MAX_ENTRIES = int(os.environ.get('SAC_CACHE_MAX_ENTRIES', 10000))  # 最大缓存条目数
+SAC_CACHE_MAX_BYTES = int(os.environ.get('SAC_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # 最大缓存字节数
+SAC_JOB_WORKERS = int(os.environ.get('SAC_JOB_WORKERS', SAC_POOL_SIZE))  # 异步完整查询的并发任务数
+SAC_JOB_TTL = float(os.environ.get('SAC_JOB_TTL', 3600))  # 已完成异步任务的保留时间（秒）
+SAC_JOB_DIR = os.environ.get(  # 异步任务状态目录（多个工作进程共享），为空时只保存在本进程内存中
+    'SAC_JOB_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'jobs')
+)
+SAC_BATCH_WORKERS = int(os.environ.get('SAC_BATCH_WORKERS', SAC_POOL_SIZE))  # 批量查询并发处理的姓名数
+SAC_BATCH_MAX_NAMES = int(os.environ.get('SAC_BATCH_MAX_NAMES', 20000))  # 单个批次的最大姓名数
+SAC_BATCH_RESCAN_INTERVAL = float(os.environ.get('SAC_BATCH_RESCAN_INTERVAL', 30))  # 扫描未完成批次的间隔（秒），0 表示只在启动时扫描
+SAC_BATCH_DIR = os.environ.get(  # 批量查询进度和结果目录
+    'SAC_BATCH_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'batches')
+)
+SAC_STORE_PATH = os.environ.get(  # 持久化结果存储路径（SQLite），为空时只使用内存缓存
+    'SAC_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'sac_results.db')
+)
+
+# PDF缓存配置
+PDF_CACHE_DIR = os.environ.get(  # PDF缓存目录，为空时不缓存
+    'PDF_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'pdf_cache')
+)
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 1024 * 1024 * 1024))  # 缓存文件总大小上限
+PDF_CACHE_TTL = float(os.environ.get('PDF_CACHE_TTL', 86400))  # 缓存有效期（秒），过期后向源站重新验证
+PDF_MAX_CONCURRENT = int(os.environ.get('PDF_MAX_CONCURRENT', PDF_POOL_SIZE))  # 同时执行的PDF下载数
+PDF_MAX_QUEUE = int(os.environ.get('PDF_MAX_QUEUE', 16))  # 排队等待的PDF下载数上限，超出时返回429
+PDF_QUEUE_TIMEOUT = float(os.environ.get('PDF_QUEUE_TIMEOUT', 60))  # PDF下载排队超时时间（秒）
+
+# 所有SAC会话共享的请求限速令牌桶
+sac_pacer = TokenBucket(rate=SAC_RATE, burst=SAC_BURST)
+
+# 全局SAC API客户端池（避免频繁创建和关闭浏览器）
+sac_pool = None
+_sac_pool_lock = threading.Lock()
+
+
+def create_sac_client() -> SACPersonAPI:
+    """创建一个SAC API客户端实例"""
+    return SACPersonAPI(
+        headless=True,
+        sleep_time=2,
+        transport=SAC_TRANSPORT,
+        detail_concurrency=SAC_DETAIL_CONCURRENCY,
+        pacer=sac_pacer,
+        base_url=SAC_BASE_URL
+    )
+
+
+def get_sac_pool() -> ResourcePool:
+    """获取SAC API客户端池（首次调用时创建并预热）"""
+    global sac_pool
+    if sac_pool is None:
+        with _sac_pool_lock:
+            if sac_pool is None:
+                logger.info(f"初始化SAC API客户端池，大小: {SAC_POOL_SIZE}")
+                pool = ResourcePool(
+                    factory=create_sac_client,
+                    size=SAC_POOL_SIZE,
+                    closer=lambda client: client.close(),
+                    name='sac',
+                    wait_timeout=SAC_POOL_TIMEOUT,
+                    validator=lambda client: client.is_alive(),
+                    validate_idle=SAC_POOL_VALIDATE_IDLE
+                )
+                pool.warm()
+                sac_pool = pool
+    return sac_pool
+
+
+def call_sac(method: str, *args, **kwargs):
+    """
+    从客户端池借出一个浏览器会话并调用 SACPersonAPI 的方法
+
+    浏览器会话失效（浏览器崩溃、会话过期）时丢弃该客户端，换用其他会话或新建会话重试一次；
+    重试时借出的会话不论空闲时间都先检查是否存活（其他会话可能同时失效）。
+    """
+    try:
+        with get_sac_pool().lease(discard_on_error=SACSessionError) as client:
+            return getattr(client, method)(*args, **kwargs)
+    except SACSessionError as e:
+        logger.warning(f"[SAC] {e}，已丢弃该会话，重试一次")
+        SAC_SESSION_RETRIES.inc()
+
+    with get_sac_pool().lease(discard_on_error=SACSessionError, validate=True) as client:
+        return getattr(client, method)(*args, **kwargs)
+
+
+# 全局查询结果缓存
+sac_cache = SACResultCache(
+    call_sac,
+    list_ttl=SAC_CACHE_LIST_TTL,
+    detail_ttl=SAC_CACHE_DETAIL_TTL,
+    stale_ttl=SAC_CACHE_STALE_TTL,
+    max_entries=SAC_CACHE_MAX_ENTRIES,
+    max_bytes=SAC_CACHE_MAX_BYTES,
+    store=ResultStore(SAC_STORE_PATH) if SAC_STORE_PATH else None,
+    detail_batch=SAC_DETAIL_CONCURRENCY
+)
+
+
+# 异步完整查询任务
+sac_jobs = JobManager(
+    lambda name, progress: sac_cache.full(name, progress_callback=progress)[0],
+    workers=SAC_JOB_WORKERS,
+    retention=SAC_JOB_TTL,
+    directory=SAC_JOB_DIR or None
+)
+
+# 批量查询（进度持久化，重启后通过 resume() 继续）
+sac_batches = BatchManager(
+    SAC_BATCH_DIR,
+    search=sac_cache.search,
+    details=sac_cache.details,
+    workers=SAC_BATCH_WORKERS
+)
+
+# 合并相同URL的并发PDF下载
+pdf_flight = SingleFlight(name='pdf')
+
+# PDF磁盘缓存
+pdf_cache = PDFCache(PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES, ttl=PDF_CACHE_TTL) if PDF_CACHE_DIR else None
+
+
+# PDF下载准入控制（限制同时下载数，超出时有界排队）
+pdf_admission = AdmissionController(
+    limit=PDF_MAX_CONCURRENT,
+    max_queue=PDF_MAX_QUEUE,
+    timeout=PDF_QUEUE_TIMEOUT,
+    name='pdf'
+)
+
+
+def download_and_cache_pdf(url: str):
+    """下载PDF并写入缓存"""
+    pdf = download_pdf(url)
+    if pdf_cache is not None:
+        try:
+            pdf.sha256 = pdf_cache.put(url, pdf.path, pdf.tier, pdf.etag, pdf.last_modified)
+        except Exception as e:
+            logger.warning(f"[PDF缓存] 写入失败: {e}")
+    return pdf
+
+
+def pdf_filename(url: str) -> str:
+    """从 URL 提取文件名"""
+    parsed = urlparse(url)
+    filename = os.path.basename(unquote(parsed.path)) or 'download.pdf'
+    if not filename.endswith('.pdf'):
+        filename += '.pdf'
+    return filename
+
+
+def fetch_pdf(url: str):
+    """经准入控制后下载PDF并写入缓存"""
+    with pdf_admission.admit() as waited:
+        timing.record('queue', waited)
+        return download_and_cache_pdf(url)
+
+
+def cached_response(result, cache_state: str):
+    """返回JSON响应，并通过 X-Cache 响应头标明缓存状态"""
+    with timing.span('serialize'):
+        response = jsonify(result)
+    response.headers['X-Cache'] = cache_state
+    return response
+
+
+# 流式输出格式
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream'
+}
+
+
+def stream_event(fmt: str, event: str, data: dict) -> str:
+    """
+    编码一条流式事件
+
+    Args:
+        fmt: 输出格式，ndjson 或 sse
+        event: 事件类型（meta / person / end / error）
+        data: 事件数据
+    """
+    if fmt == 'sse':
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps(dict(data, type=event), ensure_ascii=False) + '\n'
+
+
+def stream_full_info(name: str, fmt: str):
+    """
+    流式完整查询：每获取一个人员的详情立即输出一条记录
+
+    输出顺序: meta（姓名、总人数）→ person（按列表顺序）→ end；失败时输出 error
+    """
+    try:
+        for event, data in sac_cache.iter_full(name):
+            yield stream_event(fmt, event, data)
+
+    except Exception as e:
+        logger.error(f"[SAC完整查询] 流式输出错误: {e}", exc_info=True)
+        yield stream_event(fmt, 'error', {'name': name, 'error': str(e)})
+
+
+def pool_busy_response(tag: str, e: PoolTimeoutError):
+    """客户端池繁忙时的响应"""
+    logger.warning(f"[{tag}] 客户端池繁忙: {e}")
+    return jsonify({
+        'success': False,
+        'error': '服务繁忙，请稍后重试',
+        'message': str(e)
+    }), 503
 
 
-def get_sac_client():
-    """获取SAC API客户端实例（单例模式）"""
-    global sac_client
-    if sac_client is None:
-        logger.info("初始化SAC API客户端...")
-        sac_client = SACPersonAPI(headless=True, sleep_time=2)
-    return sac_client
+# ==================== 运行指标 ====================
+
+ROUTE_LATENCY = metrics.Histogram(
+    'http_request_duration_seconds',
+    'HTTP请求耗时（流式响应为开始输出的时间）',
+    labels=('route', 'method', 'status')
+)
+SAC_SESSION_RETRIES = metrics.Counter(
+    'sac_session_retries_total',
+    '浏览器会话失效后丢弃并重试的查询次数'
+)
+PDF_BYTES_SERVED = metrics.Counter(
+    'pdf_served_bytes_total',
+    'PDF下载接口发送的字节数（Range请求只计算实际发送的部分）',
+    labels=('tier',)
+)
+
+
+def _browser_instances():
+    """各浏览器池的存活、占用和空闲实例数"""
+    values = {}
+    for name, stats in (('sac', sac_pool.stats() if sac_pool else None), ('pdf', driver_pool_stats())):
+        if stats:
+            for state in ('alive', 'busy', 'idle', 'creating', 'waiting'):
+                values[(name, state)] = stats[state]
+    return values
+
+
+def _cache_lookups():
+    """各缓存的命中/未命中次数"""
+    stats = sac_cache.cache.stats()
+    values = {
+        ('sac', 'hit'): stats['hits'],
+        ('sac', 'stale'): stats['stale_hits'],
+        ('sac', 'miss'): stats['misses'],
+        ('sac', 'backend_hit'): stats['backend_hits'],
+    }
+    if pdf_cache:
+        values.update({
+            ('pdf', 'hit'): pdf_cache.hits,
+            ('pdf', 'revalidated'): pdf_cache.revalidated,
+            ('pdf', 'miss'): pdf_cache.misses,
+        })
+    return values
+
+
+metrics.Gauge(
+    'browser_instances',
+    '浏览器实例数（alive 存活 / busy 占用 / idle 空闲 / creating 启动中 / waiting 等待借出的请求）',
+    labels=('pool', 'state'),
+    callback=_browser_instances
+)
+metrics.CallbackCounter(
+    'cache_lookups_total',
+    '缓存查找次数（按结果）',
+    labels=('cache', 'result'),
+    callback=_cache_lookups
+)
+metrics.CallbackCounter(
+    'pdf_downloads_total',
+    'PDF下载次数（按下载方式）',
+    labels=('tier',),
+    callback=lambda: {(tier,): count for tier, count in download_stats().items()}
+)
+metrics.Gauge(
+    'pdf_admission',
+    'PDF下载准入控制（active 执行中 / queued 排队中）',
+    labels=('state',),
+    callback=lambda: {(state,): pdf_admission.stats()[state] for state in ('active', 'queued')}
+)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.timing_token = timing.start()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """记录接口耗时和PDF发送字节数，输出各阶段耗时（Server-Timing 响应头和一行JSON日志）"""
+    started = g.pop('request_started', None)
+    route = request.endpoint or 'unknown'
+    if started is not None:
+        ROUTE_LATENCY.observe(time.perf_counter() - started, route=route,
+                              method=request.method, status=response.status_code)
+    if route == 'pdf_download' and response.status_code in (200, 206):
+        PDF_BYTES_SERVED.inc(response.content_length or 0,
+                             tier=response.headers.get('X-Download-Tier', ''))
+
+    request_timing = timing.current()
+    if request_timing is not None:
+        response.headers['Server-Timing'] = request_timing.server_timing()
+        if route != 'metrics_endpoint':
+            timing.log_request(request_timing, route=route, method=request.method,
+                               status=response.status_code,
+                               cache=response.headers.get('X-Cache'))
+    return response
+
+
+@app.teardown_request
+def finish_request_timer(_exc):
+    token = g.pop('timing_token', None)
+    if token is not None:
+        timing.finish(token)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus 格式的运行指标（多进程部署时为处理该请求的工作进程的指标）"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 
 # ==================== 健康检查 ====================
@@ -55,14 +402,25 @@ def health():
                 'endpoints': [
                     '/api/sac/search',
                     '/api/sac/detail',
-                    '/api/sac/full'
-                ]
+                    '/api/sac/full',
+                    '/api/sac/jobs/<job_id>',
+                    '/api/sac/batch'
+                ],
+                'pool': sac_pool.stats() if sac_pool else None,
+                'cache': sac_cache.stats(),
+                'jobs': sac_jobs.stats(),
+                'batches': sac_batches.stats()
             },
             'pdf_download': {
                 'name': 'PDF下载代理',
                 'endpoints': [
                     '/api/pdf/download'
-                ]
+                ],
+                'singleflight': pdf_flight.stats(),
+                'pool': driver_pool_stats(),
+                'cache': pdf_cache.stats() if pdf_cache else None,
+                'admission': pdf_admission.stats(),
+                'tiers': download_stats()
             }
         },
         'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
@@ -99,11 +457,13 @@ def sac_search():
 
         logger.info(f"[SAC搜索] 姓名: {name}")
 
-        # 调用服务
-        client = get_sac_client()
-        result = client.get_person_list_by_name(name)
+        # 调用服务（优先使用缓存，未命中时从客户端池借出一个浏览器会话）
+        result, cache_state = sac_cache.search(name)
+
+        return cached_response(result, cache_state)
 
-        return jsonify(result)
+    except PoolTimeoutError as e:
+        return pool_busy_response('SAC搜索', e)
 
     except Exception as e:
         logger.error(f"[SAC搜索] 错误: {e}", exc_info=True)
@@ -142,11 +502,13 @@ def sac_detail():
 
         logger.info(f"[SAC详情] UUID: {uuid}")
 
-        # 调用服务
-        client = get_sac_client()
-        result = client.get_person_detail(uuid)
+        # 调用服务（优先使用缓存，未命中时从客户端池借出一个浏览器会话）
+        result, cache_state = sac_cache.detail(uuid)
+
+        return cached_response(result, cache_state)
 
-        return jsonify(result)
+    except PoolTimeoutError as e:
+        return pool_busy_response('SAC详情', e)
 
     except Exception as e:
         logger.error(f"[SAC详情] 错误: {e}", exc_info=True)
@@ -164,14 +526,34 @@ def sac_full():
 
     GET:  /api/sac/full?name=<姓名>
     POST: /api/sac/full with JSON {"name": "<姓名>"}
+
+    异步模式（立即返回任务ID，通过 /api/sac/jobs/<job_id> 查询进度和结果）:
+    GET:  /api/sac/full?name=<姓名>&async=1
+    POST: /api/sac/full with JSON {"name": "<姓名>", "async": true}
+
+    流式模式（每获取一个人员详情立即输出，ndjson 或 sse）:
+    GET:  /api/sac/full?name=<姓名>&stream=ndjson
+    POST: /api/sac/full with JSON {"name": "<姓名>", "stream": "sse"}
     """
     try:
         # 获取参数
         if request.method == 'GET':
             name = request.args.get('name')
+            run_async = request.args.get('async', '').lower() in ('1', 'true', 'yes')
+            stream = request.args.get('stream')
         else:
             data = request.get_json() or {}
             name = data.get('name')
+            run_async = bool(data.get('async'))
+            stream = data.get('stream')
+
+        # 也可以通过 Accept 请求头选择流式输出
+        if not stream:
+            accept = request.headers.get('Accept', '')
+            if 'text/event-stream' in accept:
+                stream = 'sse'
+            elif 'application/x-ndjson' in accept:
+                stream = 'ndjson'
 
         if not name:
             return jsonify({
@@ -185,11 +567,39 @@ def sac_full():
 
         logger.info(f"[SAC完整查询] 姓名: {name}")
 
-        # 调用服务
-        client = get_sac_client()
-        result = client.query_person_full_info(name)
+        if stream:
+            if stream not in STREAM_FORMATS:
+                return jsonify({
+                    'success': False,
+                    'error': f'不支持的流式格式: {stream}',
+                    'supported': list(STREAM_FORMATS)
+                }), 400
+
+            return Response(
+                stream_full_info(name, stream),
+                mimetype=STREAM_FORMATS[stream],
+                headers={
+                    'Cache-Control': 'no-cache',
+                    'X-Accel-Buffering': 'no'
+                }
+            )
+
+        if run_async:
+            job = sac_jobs.submit(name)
+            return jsonify({
+                'success': True,
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/api/sac/jobs/{job.id}'
+            }), 202
 
-        return jsonify(result)
+        # 调用服务（优先使用缓存，未命中时从客户端池借出一个浏览器会话）
+        result, cache_state = sac_cache.full(name)
+
+        return cached_response(result, cache_state)
+
+    except PoolTimeoutError as e:
+        return pool_busy_response('SAC完整查询', e)
 
     except Exception as e:
         logger.error(f"[SAC完整查询] 错误: {e}", exc_info=True)
@@ -200,6 +610,124 @@ def sac_full():
         }), 500
 
 
+@app.route('/api/sac/jobs/<job_id>', methods=['GET'])
+def sac_job_status(job_id):
+    """
+    异步完整查询任务状态
+
+    GET: /api/sac/jobs/<job_id>
+
+    返回任务状态、进度（已完成/总人数），执行中返回已获取的部分结果，完成后返回完整结果
+    """
+    job = sac_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在或已过期',
+            'job_id': job_id
+        }), 404
+
+    return jsonify(dict(job.to_dict(), success=True))
+
+
+@app.route('/api/sac/batch', methods=['POST'])
+def sac_batch():
+    """
+    证券从业人员批量查询 - 提交姓名列表，后台执行
+
+    POST: /api/sac/batch with JSON {"names": ["<姓名>", ...]}
+    POST: /api/sac/batch with multipart/form-data file=<CSV文件>（name/姓名 列或第一列）
+    """
+    try:
+        # 获取参数
+        upload = request.files.get('file')
+        if upload is not None:
+            names = parse_names_csv(upload.read())
+        else:
+            data = request.get_json(silent=True) or {}
+            names = data.get('names')
+
+        if not names or not isinstance(names, list):
+            return jsonify({
+                'success': False,
+                'error': '缺少参数: names',
+                'usage': {
+                    'JSON': '/api/sac/batch with JSON {"names": ["<姓名>", ...]}',
+                    'CSV': '/api/sac/batch with multipart/form-data file=<CSV文件>'
+                }
+            }), 400
+
+        if len(names) > SAC_BATCH_MAX_NAMES:
+            return jsonify({
+                'success': False,
+                'error': f'姓名数量超过上限 {SAC_BATCH_MAX_NAMES}'
+            }), 400
+
+        batch = sac_batches.submit(names)
+        logger.info(f"[SAC批量查询] 已提交 {batch.id}，{len(batch.names)} 个姓名")
+
+        return jsonify(dict(batch.to_dict(), success=True,
+                            status_url=f'/api/sac/batch/{batch.id}')), 202
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': '文件解析失败',
+            'message': str(e)
+        }), 400
+
+    except Exception as e:
+        logger.error(f"[SAC批量查询] 错误: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': '服务器内部错误',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/sac/batch/<batch_id>', methods=['GET'])
+def sac_batch_status(batch_id):
+    """
+    批量查询进度
+
+    GET: /api/sac/batch/<batch_id>
+    """
+    batch = sac_batches.get(batch_id)
+    if batch is None:
+        return jsonify({
+            'success': False,
+            'error': '批次不存在',
+            'batch_id': batch_id
+        }), 404
+
+    return jsonify(dict(batch.to_dict(), success=True))
+
+
+@app.route('/api/sac/batch/<batch_id>/results', methods=['GET'])
+def sac_batch_results(batch_id):
+    """
+    下载批量查询结果（NDJSON，每行一个姓名；执行中下载得到已完成部分）
+
+    GET: /api/sac/batch/<batch_id>/results
+    """
+    batch = sac_batches.get(batch_id)
+    if batch is None or not os.path.exists(batch.results_path):
+        return jsonify({
+            'success': False,
+            'error': '批次不存在或尚无结果',
+            'batch_id': batch_id
+        }), 404
+
+    response = send_file(
+        batch.results_path,
+        mimetype='application/x-ndjson',
+        as_attachment=True,
+        download_name=f'sac_batch_{batch_id}.ndjson'
+    )
+    response.headers['X-Batch-Status'] = batch.state.get('status', '')
+    return response
+
+
 # ==================== PDF下载API ====================
 
 @app.route('/api/pdf/download', methods=['GET', 'POST'])
@@ -230,25 +758,55 @@ def pdf_download():
 
         logger.info(f"[PDF下载] URL: {url}")
 
-        # 调用服务
-        pdf_content = download_pdf_with_chrome(url)
-
-        # 从 URL 提取文件名
-        parsed = urlparse(url)
-        filename = os.path.basename(unquote(parsed.path)) or 'download.pdf'
-        if not filename.endswith('.pdf'):
-            filename += '.pdf'
-
-        logger.info(f"[PDF下载] 成功: {filename}, {len(pdf_content)} bytes")
+        # 优先使用缓存；未命中时下载（相同URL的并发请求共享同一次下载，文件在所有请求发送完成后删除）
+        with timing.span('cache'):
+            pdf = pdf_cache.open(url, revalidate=revalidate_pdf) if pdf_cache else None
+        cache_state = pdf.cache_state if pdf else CACHE_MISS
+        if pdf is None:
+            pdf = pdf_flight.do(
+                normalize_url(url),
+                lambda: fetch_pdf(url),
+                share=lambda pdf, count: pdf.share(count)
+            )
+
+        filename = pdf_filename(url)
+
+        logger.info(f"[PDF下载] 成功: {filename}, {pdf.size} bytes, 下载方式: {pdf.tier}")
+
+        # 直接从磁盘发送文件（WSGI服务器支持时使用 wsgi.file_wrapper / sendfile）
+        # conditional 处理 Range / If-Range / If-None-Match，返回 206、304 或 416；
+        # ETag 使用文件内容哈希，重试或断点续传命中缓存时 If-Range 仍然有效
+        try:
+            response = send_file(
+                pdf.path,
+                mimetype='application/pdf',
+                as_attachment=True,
+                download_name=filename,
+                conditional=True,
+                etag=pdf.sha256 or True
+            )
+        except Exception:
+            pdf.release()
+            raise
+        response.headers['X-Download-Tier'] = pdf.tier
+        response.headers['X-Cache'] = cache_state
+        response.call_on_close(pdf.release)
+        return response
+
+    except AdmissionRejected as e:
+        logger.warning(f"[PDF下载] 拒绝请求: {e}")
+        response = jsonify({
+            'success': False,
+            'error': '下载请求过多，请稍后重试',
+            'message': str(e),
+            'retry_after': e.retry_after
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
 
-        return Response(
-            pdf_content,
-            mimetype='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename="{filename}"',
-                'Content-Length': len(pdf_content)
-            }
-        )
+    except PoolTimeoutError as e:
+        return pool_busy_response('PDF下载', e)
 
     except Exception as e:
         logger.error(f"[PDF下载] 错误: {e}", exc_info=True)
@@ -261,13 +819,43 @@ def pdf_download():
 
 # ==================== 应用启动 ====================
 
-def cleanup():
-    """清理资源"""
-    global sac_client
-    if sac_client:
-        logger.info("关闭SAC API客户端...")
-        sac_client.close()
-        sac_client = None
+def startup():
+    """
+    进程级初始化
+
+    开发服务器在启动前调用；gunicorn 在每个工作进程 fork 之后调用（见 gunicorn.conf.py），
+    浏览器和数据库连接都在工作进程中创建，不会跨 fork 共享。
+    """
+    # 继续执行上次未完成的批量查询，并定期接手其他进程退出后留下的批次
+    # （多个工作进程通过批次文件锁保证只有一个执行）
+    sac_batches.watch(SAC_BATCH_RESCAN_INTERVAL)
+
+    # 启动时解析一次ChromeDriver路径，之后创建浏览器不再查找
+    resolve_chromedriver()
+
+    # 预先启动PDF下载浏览器，首个请求无需等待浏览器启动
+    get_driver_pool()
+
+
+def cleanup(drain: bool = False):
+    """
+    清理资源
+
+    Args:
+        drain: 是否等待已提交的异步任务执行完成（gunicorn 平滑重启时使用）；
+            未完成的批量查询在下次启动时继续执行
+    """
+    global sac_pool
+    sac_jobs.shutdown(wait=drain)
+    sac_batches.shutdown(wait=False)
+    sac_cache.close()
+    if pdf_cache:
+        pdf_cache.close()
+    close_driver_pool()
+    if sac_pool:
+        logger.info("关闭SAC API客户端池...")
+        sac_pool.close()
+        sac_pool = None
 
 
 if __name__ == '__main__':
@@ -276,11 +864,13 @@ if __name__ == '__main__':
     # 注册退出清理
     atexit.register(cleanup)
 
+    startup()
+
     # 启动服务
     port = int(os.environ.get('PORT', 5000))
 
     print("=" * 60)
-    print("统一HTTP服务已启动")
+    print("统一HTTP服务已启动（开发服务器，生产环境请使用 ./start_server.sh）")
     print("=" * 60)
     print(f"服务地址: http://localhost:{port}")
     print(f"健康检查: http://localhost:{port}/health")
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+ASGI服务 - asyncio 版本的证券查询和PDF下载接口
+ASGI Entry Point - Starlette + uvicorn
+
+    uvicorn asgi:app --app-dir src --host 0.0.0.0 --port 5000
+
+/api/sac/search、/api/sac/detail、/api/sac/full 和 /api/pdf/download 由协程处理：
+等待浏览器、排队下载和合并下载的请求只占用协程，阻塞的 Selenium / SQLite / requests
+调用只在专用线程池中执行。其余接口（健康检查、异步任务、批量查询）由 Flask 应用处理。
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as flask_app  # noqa: E402
+from services.async_service import AsyncSACService, AsyncPDFService, run_blocking  # noqa: E402
+from services.pdf_service import revalidate_pdf  # noqa: E402
+from utils.admission import AsyncAdmissionController, AdmissionRejected  # noqa: E402
+from utils.pool import PoolTimeoutError  # noqa: E402
+from utils import timing  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# 专用线程池配置
+ASGI_SAC_THREADS = int(os.environ.get(  # 执行证券查询的线程数（浏览器会话数的两倍，缓存读取不必等待浏览器）
+    'ASGI_SAC_THREADS', flask_app.SAC_POOL_SIZE * 2))
+ASGI_PDF_THREADS = int(os.environ.get(  # 执行PDF下载的线程数
+    'ASGI_PDF_THREADS', flask_app.PDF_MAX_CONCURRENT))
+ASGI_IO_THREADS = int(os.environ.get('ASGI_IO_THREADS', 8))  # 执行缓存查找等短时阻塞操作的线程数
+
+sac_executor = ThreadPoolExecutor(max_workers=ASGI_SAC_THREADS, thread_name_prefix='asgi-sac')
+pdf_executor = ThreadPoolExecutor(max_workers=ASGI_PDF_THREADS, thread_name_prefix='asgi-pdf')
+io_executor = ThreadPoolExecutor(max_workers=ASGI_IO_THREADS, thread_name_prefix='asgi-io')
+
+sac_service = AsyncSACService(flask_app.sac_cache, sac_executor)
+pdf_service = AsyncPDFService(
+    fetch=flask_app.download_and_cache_pdf,
+    admission=AsyncAdmissionController(
+        limit=ASGI_PDF_THREADS,
+        max_queue=flask_app.PDF_MAX_QUEUE,
+        timeout=flask_app.PDF_QUEUE_TIMEOUT,
+        name='pdf-async'
+    ),
+    executor=pdf_executor,
+    io_executor=io_executor,
+    cache=flask_app.pdf_cache,
+    revalidate=revalidate_pdf
+)
+
+
+class JSONUTF8Response(JSONResponse):
+    """与 Flask 接口相同的 JSON 响应"""
+
+    def render(self, content) -> bytes:
+        return json.dumps(content, ensure_ascii=False).encode('utf-8')
+
+
+class ReleasingFileResponse(FileResponse):
+    """发送完成或客户端断开后释放文件（合并下载的临时文件在所有请求释放后删除）"""
+
+    def __init__(self, *args, release, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release()
+
+
+async def read_params(request: Request) -> dict:
+    """读取请求参数：GET 使用查询参数，POST 使用 JSON"""
+    if request.method == 'POST':
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        return data if isinstance(data, dict) else {}
+    return dict(request.query_params)
+
+
+def missing_param(param: str, path: str) -> JSONUTF8Response:
+    """缺少参数时的响应"""
+    return JSONUTF8Response({
+        'success': False,
+        'error': f'缺少参数: {param}',
+        'usage': {
+            'GET': f'{path}?{param}=<{param}>',
+            'POST': f'{path} with JSON {{"{param}": "<{param}>"}}'
+        }
+    }, status_code=400)
+
+
+def error_response(tag: str, e: Exception) -> JSONUTF8Response:
+    """异常对应的响应：排队已满 429、客户端池繁忙 503、其他 500"""
+    if isinstance(e, AdmissionRejected):
+        logger.warning(f"[{tag}] 拒绝请求: {e}")
+        return JSONUTF8Response({
+            'success': False,
+            'error': '下载请求过多，请稍后重试',
+            'message': str(e),
+            'retry_after': e.retry_after
+        }, status_code=429, headers={'Retry-After': str(e.retry_after)})
+
+    if isinstance(e, PoolTimeoutError):
+        logger.warning(f"[{tag}] 客户端池繁忙: {e}")
+        return JSONUTF8Response({
+            'success': False,
+            'error': '服务繁忙，请稍后重试',
+            'message': str(e)
+        }, status_code=503)
+
+    logger.error(f"[{tag}] 错误: {e}", exc_info=True)
+    return JSONUTF8Response({
+        'success': False,
+        'error': '服务器内部错误',
+        'message': str(e)
+    }, status_code=500)
+
+
+def cached_response(result, cache_state: str) -> JSONUTF8Response:
+    """返回JSON响应，并通过 X-Cache 响应头标明缓存状态"""
+    with timing.span('serialize'):
+        return JSONUTF8Response(result, headers={'X-Cache': cache_state})
+
+
+# ==================== 证券查询API ====================
+
+async def sac_search(request: Request):
+    """证券从业人员查询 - 按姓名搜索"""
+    name = (await read_params(request)).get('name')
+    if not name:
+        return missing_param('name', '/api/sac/search')
+
+    logger.info(f"[SAC搜索] 姓名: {name}")
+    try:
+        return cached_response(*await sac_service.search(name))
+    except Exception as e:
+        return error_response('SAC搜索', e)
+
+
+async def sac_detail(request: Request):
+    """证券从业人员详情 - 按UUID查询"""
+    uuid = (await read_params(request)).get('uuid')
+    if not uuid:
+        return missing_param('uuid', '/api/sac/detail')
+
+    logger.info(f"[SAC详情] UUID: {uuid}")
+    try:
+        return cached_response(*await sac_service.detail(uuid))
+    except Exception as e:
+        return error_response('SAC详情', e)
+
+
+async def sac_full(request: Request):
+    """证券从业人员完整信息 - 按姓名查询所有详情（支持 async 和 stream 参数，与 Flask 接口相同）"""
+    params = await read_params(request)
+    name = params.get('name')
+    if request.method == 'POST':
+        run_async = bool(params.get('async'))
+    else:
+        run_async = str(params.get('async', '')).lower() in ('1', 'true', 'yes')
+    stream = params.get('stream')
+
+    # 也可以通过 Accept 请求头选择流式输出
+    if not stream:
+        accept = request.headers.get('accept', '')
+        if 'text/event-stream' in accept:
+            stream = 'sse'
+        elif 'application/x-ndjson' in accept:
+            stream = 'ndjson'
+
+    if not name:
+        return missing_param('name', '/api/sac/full')
+
+    logger.info(f"[SAC完整查询] 姓名: {name}")
+
+    if stream:
+        if stream not in flask_app.STREAM_FORMATS:
+            return JSONUTF8Response({
+                'success': False,
+                'error': f'不支持的流式格式: {stream}',
+                'supported': list(flask_app.STREAM_FORMATS)
+            }, status_code=400)
+
+        return StreamingResponse(
+            sac_service.stream(flask_app.stream_full_info(name, stream)),
+            media_type=flask_app.STREAM_FORMATS[stream],
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+    try:
+        if run_async:
+            job = flask_app.sac_jobs.submit(name)
+            return JSONUTF8Response({
+                'success': True,
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/api/sac/jobs/{job.id}'
+            }, status_code=202)
+
+        return cached_response(*await sac_service.full(name))
+    except Exception as e:
+        return error_response('SAC完整查询', e)
+
+
+# ==================== PDF下载API ====================
+
+async def pdf_download(request: Request):
+    """PDF下载代理（支持 Range / If-Range，与 Flask 接口相同）"""
+    url = (await read_params(request)).get('url')
+    if not url:
+        return missing_param('url', '/api/pdf/download')
+
+    logger.info(f"[PDF下载] URL: {url}")
+    try:
+        pdf, cache_state = await pdf_service.get(url)
+    except Exception as e:
+        return error_response('PDF下载', e)
+
+    filename = flask_app.pdf_filename(url)
+    logger.info(f"[PDF下载] 成功: {filename}, {pdf.size} bytes, 下载方式: {pdf.tier}")
+
+    headers = {
+        'X-Download-Tier': pdf.tier,
+        'X-Cache': cache_state
+    }
+    if pdf.sha256:
+        headers['ETag'] = f'"{pdf.sha256}"'
+
+    return ReleasingFileResponse(
+        pdf.path,
+        media_type='application/pdf',
+        filename=filename,
+        headers=headers,
+        release=pdf.release
+    )
+
+
+# ==================== 健康检查 ====================
+
+async def health(request: Request):
+    """健康检查（在 Flask 健康检查的基础上增加异步服务的统计）"""
+    def collect():
+        with flask_app.app.app_context():
+            return flask_app.health().get_json()
+
+    data = await run_blocking(io_executor, collect)
+    data['asgi'] = {
+        'sac_threads': ASGI_SAC_THREADS,
+        'io_threads': ASGI_IO_THREADS,
+        'pdf': pdf_service.stats()
+    }
+    return JSONUTF8Response(data)
+
+
+# ==================== 运行指标 ====================
+
+class MetricsMiddleware:
+    """记录协程接口的耗时、各阶段耗时和PDF发送字节数（Flask 处理的接口由 Flask 自行记录）"""
+
+    def __init__(self, asgi_app):
+        self.app = asgi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        response = {}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = dict(message.get('headers', []))
+                endpoint = scope.get('endpoint')
+                if endpoint is not None and endpoint.__module__ == __name__:
+                    # 协程接口：添加 Server-Timing 响应头并输出计时日志（Flask 接口由 Flask 自行处理）
+                    request_timing = timing.current()
+                    message = dict(message, headers=list(message.get('headers', [])) + [
+                        (b'server-timing', request_timing.server_timing().encode())
+                    ])
+                    timing.log_request(
+                        request_timing, route=endpoint.__name__, method=scope['method'],
+                        status=message['status'],
+                        cache=response['headers'].get(b'x-cache', b'').decode() or None
+                    )
+            await send(message)
+
+        token = timing.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            timing.finish(token)
+            endpoint = scope.get('endpoint')
+            if endpoint is not None and endpoint.__module__ == __name__:
+                status = response.get('status', 500)
+                flask_app.ROUTE_LATENCY.observe(time.perf_counter() - started, route=endpoint.__name__,
+                                                method=scope['method'], status=status)
+                headers = response.get('headers', {})
+                if endpoint is pdf_download and status in (200, 206):
+                    flask_app.PDF_BYTES_SERVED.inc(
+                        int(headers.get(b'content-length', 0)),
+                        tier=headers.get(b'x-download-tier', b'').decode()
+                    )
+
+
+# ==================== 应用 ====================
+
+@asynccontextmanager
+async def lifespan(_app):
+    """进程启动时初始化浏览器池，退出时等待异步任务并关闭浏览器"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(io_executor, flask_app.startup)
+    try:
+        yield
+    finally:
+        await loop.run_in_executor(None, lambda: flask_app.cleanup(drain=True))
+        for executor in (sac_executor, pdf_executor, io_executor):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = Starlette(
+    routes=[
+        Route('/', health, methods=['GET']),
+        Route('/health', health, methods=['GET']),
+        Route('/api/sac/search', sac_search, methods=['GET', 'POST']),
+        Route('/api/sac/detail', sac_detail, methods=['GET', 'POST']),
+        Route('/api/sac/full', sac_full, methods=['GET', 'POST']),
+        Route('/api/pdf/download', pdf_download, methods=['GET', 'POST']),
+        # 其余接口（异步任务、批量查询）由 Flask 应用处理
+        Mount('/', app=WSGIMiddleware(flask_app.app)),
+    ],
+    lifespan=lifespan
+)
+app.add_middleware(MetricsMiddleware)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,182 @@
+"""
+异步服务封装
+Async Services - 供 ASGI 服务使用的 asyncio 版本的查询和下载服务
+
+Selenium、SQLite 和 requests 调用都是阻塞的，只在专用线程池中执行；
+等待浏览器、排队和合并下载的请求只占用协程，不占用线程。
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+from services.sac_cache import SACResultCache
+from services.pdf_cache import PDFCache, normalize_url
+from utils.admission import AsyncAdmissionController
+from utils.cache import CACHE_HIT, CACHE_MISS
+from utils import timing
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+async def run_blocking(executor: Executor, fn: Callable, *args, **kwargs) -> Any:
+    """在指定线程池中执行阻塞函数（传递当前上下文，线程中的分阶段计时记录到当前请求）"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, fn, *args, **kwargs))
+
+
+async def iterate_blocking(executor: Executor, iterator: Iterator) -> AsyncIterator:
+    """
+    在线程池中逐项读取阻塞的迭代器
+
+    每次只有一个线程推进迭代器；结束或客户端断开时在线程池中关闭生成器，释放其持有的资源。
+    """
+    try:
+        while True:
+            item = await run_blocking(executor, next, iterator, _DONE)
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await run_blocking(executor, close)
+
+
+class AsyncSACService:
+    """证券从业人员查询（asyncio 版本），未过期的缓存直接在事件循环中返回"""
+
+    def __init__(self, cache: SACResultCache, executor: Executor):
+        """
+        初始化异步查询服务
+
+        Args:
+            cache: 查询结果缓存（未命中时通过客户端池请求上游）
+            executor: 执行阻塞查询的线程池
+        """
+        self.cache = cache
+        self.executor = executor
+
+    async def _get(self, key: Tuple[str, str], load: Callable, *args) -> Tuple[Dict, str]:
+        value = self.cache.cache.get_if_fresh(key)
+        if value is not None:
+            return value, CACHE_HIT
+        return await run_blocking(self.executor, load, *args)
+
+    async def search(self, name: str) -> Tuple[Dict, str]:
+        """按姓名查询人员列表，返回 (result, cache_state)"""
+        return await self._get(('list', name), self.cache.search, name)
+
+    async def detail(self, uuid: str) -> Tuple[Dict, str]:
+        """按UUID查询人员详情，返回 (result, cache_state)"""
+        return await self._get(('detail', uuid), self.cache.detail, uuid)
+
+    async def full(self, name: str) -> Tuple[Dict, str]:
+        """按姓名查询所有人员的完整信息，返回 (result, cache_state)"""
+        return await self._get(('full', name), self.cache.full, name)
+
+    def stream(self, events: Iterator[str]) -> AsyncIterator[str]:
+        """在线程池中逐条输出流式查询结果"""
+        return iterate_blocking(self.executor, events)
+
+
+class AsyncPDFService:
+    """
+    PDF下载（asyncio 版本）
+
+    - 缓存查找在 I/O 线程池中执行
+    - 未命中时经过协程排队的准入控制，下载在专用线程池中执行
+    - 相同URL的并发请求合并为一次下载，所有请求发送完成后删除临时文件
+    """
+
+    def __init__(self, fetch: Callable[[str], Any], admission: AsyncAdmissionController,
+                 executor: Executor, io_executor: Executor,
+                 cache: Optional[PDFCache] = None,
+                 revalidate: Optional[Callable[[str, Optional[str], Optional[str]], bool]] = None):
+        """
+        初始化异步下载服务
+
+        Args:
+            fetch: 下载并缓存PDF的阻塞函数，返回 DownloadedPDF
+            admission: 下载准入控制
+            executor: 执行下载的线程池（大小应与准入控制的并发上限一致）
+            io_executor: 执行缓存查找的线程池
+            cache: PDF缓存
+            revalidate: 缓存过期时的重新验证函数
+        """
+        self.fetch = fetch
+        self.admission = admission
+        self.executor = executor
+        self.io_executor = io_executor
+        self.cache = cache
+        self.revalidate = revalidate
+        self._downloads = {}
+        self._consumers = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def get(self, url: str) -> Tuple[Any, str]:
+        """
+        获取PDF文件
+
+        Returns:
+            (pdf, cache_state): 缓存文件或下载的文件（发送完成后需调用 release()）及缓存状态
+
+        Raises:
+            AdmissionRejected: 下载排队已满或超时
+        """
+        if self.cache is not None:
+            with timing.span('cache'):
+                pdf = await run_blocking(self.io_executor, self.cache.open, url, self.revalidate)
+            if pdf is not None:
+                return pdf, pdf.cache_state
+
+        key = normalize_url(url)
+        task = self._downloads.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._download(key, url))
+            self._downloads[key] = task
+            self._consumers[key] = 0
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        self._consumers[key] += 1
+
+        try:
+            return await asyncio.shield(task), CACHE_MISS
+        except asyncio.CancelledError:
+            # 客户端已断开，下载完成后释放本请求持有的引用
+            task.add_done_callback(self._release_abandoned)
+            raise
+
+    async def _download(self, key: str, url: str):
+        """经准入控制后在线程池中下载，完成后按合并的请求数设置文件引用数"""
+        try:
+            async with self.admission.admit() as waited:
+                timing.record('queue', waited)
+                pdf = await run_blocking(self.executor, self.fetch, url)
+        finally:
+            self._downloads.pop(key, None)
+            consumers = self._consumers.pop(key, 1)
+        pdf.share(consumers)
+        return pdf
+
+    @staticmethod
+    def _release_abandoned(task: asyncio.Future):
+        if not task.cancelled() and task.exception() is None:
+            task.result().release()
+
+    def stats(self) -> Dict:
+        """返回下载统计信息"""
+        return {
+            'in_flight': len(self._downloads),
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'admission': self.admission.stats(),
+        }
@@ -0,0 +1,373 @@
+"""
+PDF文件缓存
+PDF Cache - 按URL索引、按内容哈希存储的磁盘缓存
+
+- 以规范化后的URL为键，内容相同的文件只保存一份（blobs/<sha256前两位>/<sha256>）
+- 索引保存在 SQLite (WAL 模式) 中，多个进程共享同一个缓存目录
+- 超过有效期后，如果源站提供了 ETag / Last-Modified，先发送条件请求重新验证，
+  源站返回 304 时继续使用缓存文件
+- 总大小超过上限时按最近访问时间淘汰文件；本进程正在发送的文件不会被淘汰
+- 命中时直接从磁盘发送文件，不需要启动浏览器
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import logging
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from utils.cache import CACHE_HIT
+
+logger = logging.getLogger(__name__)
+
+# 缓存状态：过期后经源站验证仍然有效
+CACHE_REVALIDATED = 'REVALIDATED'
+
+# 缓存命中时的下载方式
+TIER_CACHE = 'cache'
+
+BUSY_TIMEOUT = 30  # 等待其他进程释放写锁的时间（秒）
+HASH_CHUNK_SIZE = 1024 * 1024  # 计算哈希时每次读取的字节数
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    规范化URL，使同一个文件的不同写法得到相同的键
+
+    协议和主机名转为小写，去掉默认端口和片段，查询参数按名称排序。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else '')
+        host = f"{userinfo}@{host}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def file_sha256(path: str) -> str:
+    """计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CachedPDF:
+    """
+    缓存中的 PDF 文件（与 DownloadedPDF 使用方式相同）
+
+    open() 返回时文件已被固定，发送完成前不会被淘汰；
+    每个使用者发送完成后调用 release()，全部释放后文件才可以被淘汰。
+    """
+
+    def __init__(self, cache: 'PDFCache', path: str, sha256: str, size: int, cache_state: str):
+        self.cache = cache
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+        self.tier = TIER_CACHE
+        self.cache_state = cache_state
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    def share(self, count: int):
+        """设置共享该文件的使用者数量"""
+        with self._lock:
+            delta = count - self._refs
+            self._refs = count
+        self.cache._pin(self.sha256, delta)
+
+    def release(self):
+        """释放一个使用者"""
+        with self._lock:
+            if self._refs <= 0:
+                return
+            self._refs -= 1
+        self.cache._pin(self.sha256, -1)
+
+
+class PDFCache:
+    """内容寻址的 PDF 磁盘缓存，多进程、多线程安全"""
+
+    def __init__(self, root: str, max_bytes: int = 1024 * 1024 * 1024, ttl: float = 86400):
+        """
+        初始化PDF缓存
+
+        Args:
+            root: 缓存目录（目录不存在时自动创建）
+            max_bytes: 缓存文件总大小上限
+            ttl: 缓存有效期（秒），过期后需要向源站重新验证或重新下载
+        """
+        self.root = root
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self.path = os.path.join(root, 'index.db')
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pins: Dict[str, int] = {}  # 本进程正在发送的文件 sha256 -> 使用者数
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stored = 0
+        self.deduplicated = 0
+        self.evictions = 0
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                source_tier TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_blobs_access ON blobs (last_access)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_urls_sha256 ON urls (sha256)')
+        logger.info(f"✓ PDF缓存已打开: {root}")
+
+    def _conn(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256[:2], sha256)
+
+    def _count(self, attr: str):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def _pin(self, sha256: str, delta: int):
+        """调整文件的使用者数，使用者数大于0的文件不会被淘汰"""
+        with self._lock:
+            pins = self._pins.get(sha256, 0) + delta
+            if pins > 0:
+                self._pins[sha256] = pins
+            else:
+                self._pins.pop(sha256, None)
+
+    def _pin_if_exists(self, sha256: str) -> bool:
+        """文件存在时固定它（与淘汰互斥，返回后文件不会被本进程删除）"""
+        with self._lock:
+            if not os.path.exists(self._blob_path(sha256)):
+                return False
+            self._pins[sha256] = self._pins.get(sha256, 0) + 1
+            return True
+
+    # ==================== 读取 ====================
+
+    def open(self, url: str,
+             revalidate: Optional[Callable[[str, Optional[str], Optional[str]], bool]] = None
+             ) -> Optional[CachedPDF]:
+        """
+        查找缓存的 PDF
+
+        Args:
+            url: PDF 文件的 URL
+            revalidate: 缓存过期时调用 revalidate(url, etag, last_modified)，返回 True 表示仍然有效
+
+        Returns:
+            CachedPDF: 命中时返回缓存文件（已固定，发送完成后需调用 release()）；
+                未缓存、已过期且无法验证时返回 None
+        """
+        key = normalize_url(url)
+        conn = self._conn()
+        row = conn.execute(
+            'SELECT u.sha256, u.etag, u.last_modified, u.fetched_at, b.size '
+            'FROM urls u JOIN blobs b ON b.sha256 = u.sha256 WHERE u.url = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+
+        sha256, etag, last_modified, fetched_at, size = row
+        if not self._pin_if_exists(sha256):
+            conn.execute('DELETE FROM urls WHERE sha256 = ?', (sha256,))
+            conn.execute('DELETE FROM blobs WHERE sha256 = ?', (sha256,))
+            self._count('misses')
+            return None
+
+        now = time.time()
+        cache_state = CACHE_HIT
+        if now - fetched_at > self.ttl:
+            try:
+                valid = bool(etag or last_modified) and revalidate is not None \
+                    and revalidate(url, etag, last_modified)
+            except BaseException:
+                self._pin(sha256, -1)
+                raise
+            if not valid:
+                self._pin(sha256, -1)
+                self._count('misses')
+                return None
+            conn.execute('UPDATE urls SET fetched_at = ? WHERE url = ?', (now, key))
+            cache_state = CACHE_REVALIDATED
+            self._count('revalidated')
+        else:
+            self._count('hits')
+
+        conn.execute('UPDATE blobs SET last_access = ? WHERE sha256 = ?', (now, sha256))
+        return CachedPDF(self, self._blob_path(sha256), sha256, size, cache_state)
+
+    # ==================== 写入与淘汰 ====================
+
+    def put(self, url: str, file_path: str, source_tier: Optional[str] = None,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> Optional[str]:
+        """
+        缓存下载完成的文件（文件本身保持不变，缓存保存一份硬链接或副本）
+
+        Args:
+            url: PDF 文件的 URL
+            file_path: 下载完成的文件
+            source_tier: 下载方式
+            etag: 源站返回的 ETag
+            last_modified: 源站返回的 Last-Modified
+
+        Returns:
+            str: 文件的 SHA-256；文件超过缓存上限时不缓存，返回 None
+        """
+        size = os.path.getsize(file_path)
+        if size > self.max_bytes:
+            return None
+
+        sha256 = file_sha256(file_path)
+        blob_path = self._blob_path(sha256)
+        if os.path.exists(blob_path):
+            self._count('deduplicated')
+        else:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.link(file_path, tmp_path)
+            except OSError:
+                shutil.copyfile(file_path, tmp_path)
+            os.replace(tmp_path, blob_path)
+            self._count('stored')
+
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            'INSERT INTO blobs (sha256, size, created_at, last_access) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (sha256) DO UPDATE SET last_access = excluded.last_access',
+            (sha256, size, now, now)
+        )
+        conn.execute(
+            'INSERT OR REPLACE INTO urls (url, sha256, source_tier, etag, last_modified, fetched_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (normalize_url(url), sha256, source_tier, etag, last_modified, now)
+        )
+
+        self._evict()
+        return sha256
+
+    def _evict(self):
+        """
+        删除不再被引用的文件，并按最近访问时间淘汰文件直到总大小不超过上限
+
+        本进程正在发送的文件跳过，留到之后的淘汰中处理。
+        """
+        conn = self._conn()
+        victims = [row[0] for row in conn.execute(
+            'SELECT sha256 FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM urls)'
+        )]
+
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        if total > self.max_bytes:
+            for sha256, size in conn.execute('SELECT sha256, size FROM blobs ORDER BY last_access'):
+                if total <= self.max_bytes:
+                    break
+                if self._pins.get(sha256):
+                    continue
+                if sha256 not in victims:
+                    victims.append(sha256)
+                total -= size
+
+        evicted = 0
+        for sha256 in victims:
+            with self._lock:
+                if self._pins.get(sha256):
+                    continue
+                conn.execute('DELETE FROM urls WHERE sha256 = ?', (sha256,))
+                conn.execute('DELETE FROM blobs WHERE sha256 = ?', (sha256,))
+                try:
+                    os.remove(self._blob_path(sha256))
+                except OSError:
+                    pass
+                self.evictions += 1
+            evicted += 1
+
+        if evicted:
+            logger.info(f"[PDF缓存] 淘汰 {evicted} 个文件")
+
+    # ==================== 统计与关闭 ====================
+
+    def stats(self) -> Dict:
+        """返回缓存统计信息"""
+        conn = self._conn()
+        blobs, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+        urls = conn.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            return {
+                'root': self.root,
+                'urls': urls,
+                'files': blobs,
+                'bytes': total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'revalidated': self.revalidated,
+                'misses': self.misses,
+                'stored': self.stored,
+                'deduplicated': self.deduplicated,
+                'evictions': self.evictions,
+                'pinned': len(self._pins),
+                'hit_ratio': round((self.hits + self.revalidated) / lookups, 3) if lookups else None,
+            }
+
+    def close(self):
+        """关闭所有连接"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
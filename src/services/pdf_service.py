@@ -2,22 +2,81 @@
 PDF下载代理服务
 PDF Download Proxy Service - 基于 Selenium + Chrome WebDriver
 使用真实的 Chrome 浏览器下载 PDF 文件，可以绕过各种反爬措施
+
+分级下载：先用模拟浏览器的HTTP请求直接下载，内容以 %PDF 开头时直接使用；
+遇到反爬页面、HTML响应或请求错误时再使用 Chrome 浏览器下载。
 """
 
 import os
+import json
 import time
 import tempfile
 import shutil
+import threading
+from typing import Callable, Dict, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import SessionNotCreatedException
 import logging
 
+from utils.pool import ResourcePool
+from utils.chromedriver import reset_chromedriver, resolve_chromedriver
+from utils import timing
+
 logger = logging.getLogger(__name__)
 
 # 配置
 DOWNLOAD_TIMEOUT = 120  # 下载超时时间（秒）
 CHROME_HEADLESS = True  # 是否无头模式
+PDF_POOL_SIZE = int(os.environ.get('PDF_POOL_SIZE', 4))  # PDF下载浏览器数量上限
+PDF_POOL_MIN_IDLE = int(os.environ.get('PDF_POOL_MIN_IDLE', 1))  # 预先启动的空闲浏览器数量
+PDF_POOL_TIMEOUT = float(os.environ.get('PDF_POOL_TIMEOUT', 60))  # 等待空闲浏览器的超时时间（秒）
+PDF_DIRECT_ENABLED = os.environ.get('PDF_DIRECT', '1') != '0'  # 是否先尝试HTTP直接下载
+DIRECT_CONNECT_TIMEOUT = 10  # HTTP直接下载连接超时时间（秒）
+DIRECT_READ_TIMEOUT = 60  # HTTP直接下载读取超时时间（秒）
+DIRECT_POOL_SIZE = 10  # HTTP直接下载连接池大小
+CHUNK_SIZE = 64 * 1024  # 读取响应的块大小
+EVENT_POLL_INTERVAL = 0.1  # 读取浏览器下载事件的间隔（秒）
+DIR_POLL_INTERVAL = 0.5  # 检查下载目录的间隔（秒），两次检查之间大小不变的文件视为完成
+
+# HTTP直接下载使用的请求头 - 模拟真实浏览器
+DIRECT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36',
+    'Accept': 'application/pdf,application/octet-stream;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+# 下载方式
+TIER_DIRECT = 'direct'
+TIER_CHROME = 'chrome'
+
+
+class NotPDFError(Exception):
+    """HTTP直接下载得到的不是PDF（反爬页面、HTML等），需要使用浏览器"""
+
+
+# 各下载方式的统计
+_stats = {
+    'direct': 0,  # HTTP直接下载成功
+    'chrome': 0,  # 浏览器下载成功
+    'direct_escalated': 0,  # HTTP直接下载失败后改用浏览器
+    'failed': 0,  # 所有方式均失败
+}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def download_stats() -> Dict:
+    """返回各下载方式的统计"""
+    with _stats_lock:
+        return dict(_stats)
 
 
 def create_chrome_driver(download_dir: str) -> webdriver.Chrome:
@@ -62,41 +121,35 @@ def create_chrome_driver(download_dir: str) -> webdriver.Chrome:
     }
     chrome_options.add_experimental_option('prefs', prefs)
 
-    # 尝试查找 ChromeDriver
-    chromedriver_path = None
-
-    # 尝试使用 webdriver-manager
-    try:
-        from webdriver_manager.chrome import ChromeDriverManager
-        wdm_path = ChromeDriverManager().install()
-        # webdriver-manager 有时返回错误的路径，需要修正
-        import os as wdm_os
-        if wdm_os.path.basename(wdm_path) != 'chromedriver':
-            # 查找同目录下的 chromedriver
-            dir_path = wdm_os.path.dirname(wdm_path)
-            chromedriver_candidate = wdm_os.path.join(dir_path, 'chromedriver')
-            if wdm_os.path.exists(chromedriver_candidate):
-                chromedriver_path = chromedriver_candidate
-            else:
-                # 尝试父目录
-                parent_dir = wdm_os.path.dirname(dir_path)
-                chromedriver_candidate = wdm_os.path.join(parent_dir, 'chromedriver')
-                if wdm_os.path.exists(chromedriver_candidate):
-                    chromedriver_path = chromedriver_candidate
-        else:
-            chromedriver_path = wdm_path
-    except Exception as e:
-        logger.warning(f"webdriver-manager 失败: {e}")
+    # 通过性能日志接收 CDP 下载事件（Page.downloadWillBegin / downloadProgress）
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    chrome_options.add_experimental_option('perfLoggingPrefs', {
+        'enableNetwork': False,
+        'enablePage': True
+    })
 
-    if chromedriver_path:
-        logger.info(f"使用 ChromeDriver: {chromedriver_path}")
-        service = Service(chromedriver_path)
-    else:
-        # 回退到系统 PATH
-        logger.info("使用系统 PATH 中的 chromedriver")
-        service = Service()
+    # ChromeDriver 路径在进程内只解析一次；Chrome 升级后旧的 ChromeDriver 无法创建会话，
+    # 此时清除解析记录，重新解析后再试一次
+    for attempt in range(2):
+        chromedriver_path = resolve_chromedriver()
 
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+        if chromedriver_path:
+            logger.info(f"使用 ChromeDriver: {chromedriver_path}")
+            service = Service(chromedriver_path)
+        else:
+            # 回退到系统 PATH
+            logger.info("使用系统 PATH 中的 chromedriver")
+            service = Service()
+
+        try:
+            with timing.span('chrome_launch'):
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+            break
+        except SessionNotCreatedException as e:
+            if attempt or not chromedriver_path:
+                raise
+            logger.warning(f"ChromeDriver 无法创建会话（可能与 Chrome 版本不匹配），重新解析: {e}")
+            reset_chromedriver()
 
     # 设置 CDP 命令允许下载
     driver.execute_cdp_cmd('Page.setDownloadBehavior', {
@@ -107,78 +160,448 @@ def create_chrome_driver(download_dir: str) -> webdriver.Chrome:
     return driver
 
 
-def wait_for_download(download_dir: str, timeout: int = DOWNLOAD_TIMEOUT) -> str:
+class PooledDriver:
+    """资源池中的 Chrome 实例及其默认下载目录"""
+
+    def __init__(self):
+        self.base_dir = tempfile.mkdtemp(prefix='pdf_driver_')
+        try:
+            self.driver = create_chrome_driver(self.base_dir)
+        except Exception:
+            shutil.rmtree(self.base_dir, ignore_errors=True)
+            raise
+
+    def set_download_dir(self, download_dir: str):
+        """
+        通过 CDP 将下载目录切换到本次请求的独立目录
+
+        优先使用 Browser.setDownloadBehavior 的 allowAndName 模式（文件以下载GUID命名，
+        完成事件可以准确对应到文件），不支持时回退到 Page.setDownloadBehavior。
+        """
+        try:
+            self.driver.execute_cdp_cmd('Browser.setDownloadBehavior', {
+                'behavior': 'allowAndName',
+                'downloadPath': download_dir,
+                'eventsEnabled': True
+            })
+        except Exception:
+            self.driver.execute_cdp_cmd('Page.setDownloadBehavior', {
+                'behavior': 'allow',
+                'downloadPath': download_dir
+            })
+
+    def drain_events(self):
+        """丢弃之前请求残留的浏览器事件"""
+        try:
+            self.driver.get_log('performance')
+        except Exception:
+            pass
+
+    def reset(self):
+        """请求结束后清理页面状态，下载目录切回默认目录"""
+        self.driver.get('about:blank')
+        self.set_download_dir(self.base_dir)
+
+    def close(self):
+        """关闭浏览器并删除默认下载目录"""
+        try:
+            self.driver.quit()
+        finally:
+            shutil.rmtree(self.base_dir, ignore_errors=True)
+
+
+# 全局PDF下载浏览器池
+driver_pool = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> ResourcePool:
+    """获取PDF下载浏览器池（首次调用时创建，并在后台启动备用实例）"""
+    global driver_pool
+    if driver_pool is None:
+        with _driver_pool_lock:
+            if driver_pool is None:
+                logger.info(f"[Chrome] 初始化PDF下载浏览器池，大小: {PDF_POOL_SIZE}，"
+                            f"备用实例: {PDF_POOL_MIN_IDLE}")
+                driver_pool = ResourcePool(
+                    factory=PooledDriver,
+                    size=PDF_POOL_SIZE,
+                    closer=lambda pooled: pooled.close(),
+                    name='pdf',
+                    wait_timeout=PDF_POOL_TIMEOUT,
+                    min_idle=PDF_POOL_MIN_IDLE
+                )
+                driver_pool.replenish()
+    return driver_pool
+
+
+def driver_pool_stats():
+    """返回PDF下载浏览器池统计信息，尚未创建时返回 None"""
+    return driver_pool.stats() if driver_pool is not None else None
+
+
+def close_driver_pool():
+    """关闭PDF下载浏览器池"""
+    global driver_pool
+    if driver_pool is not None:
+        driver_pool.close()
+        driver_pool = None
+
+
+def is_partial_file(filename: str) -> bool:
+    """是否为未完成的临时下载文件"""
+    return (
+        filename.endswith('.crdownload')
+        or filename.endswith('.tmp')
+        or filename.startswith('.')
+    )
+
+
+def _read_download_events(driver) -> list:
+    """读取浏览器性能日志中的下载事件 [(method, params), ...]"""
+    events = []
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, TypeError, ValueError):
+            continue
+        method = message.get('method', '')
+        if method.endswith('.downloadWillBegin') or method.endswith('.downloadProgress'):
+            events.append((method, message.get('params', {})))
+    return events
+
+
+def _find_completed_file(download_dir: str, sizes: Dict[str, int],
+                         incomplete: Tuple[str, ...] = ()) -> Optional[str]:
+    """
+    检查下载目录，返回已完成的文件
+
+    文件不是临时文件、不在 incomplete 中（下载事件显示尚未接收完的文件），
+    且两次检查之间大小不变才视为完成。
+    """
+    for filename in sorted(os.listdir(download_dir)):
+        if is_partial_file(filename) or filename in incomplete:
+            continue
+        path = os.path.join(download_dir, filename)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        if size > 0 and sizes.get(filename) == size:
+            return path
+        sizes[filename] = size
+    return None
+
+
+def wait_for_download(download_dir: str, timeout: int = DOWNLOAD_TIMEOUT, driver=None,
+                      progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
     """
     等待下载完成
 
+    传入 driver 时根据浏览器的 CDP 下载事件判断：收到 state 为 completed 的
+    downloadProgress 事件即视为完成，并通过下载GUID或建议文件名定位文件；
+    canceled 事件立即报错。同时每隔 DIR_POLL_INTERVAL 秒检查下载目录，
+    文件大小稳定后也视为完成（没有 driver、没有收到事件或完成事件丢失时使用），
+    下载事件显示尚未接收完的文件除外。
+
     Args:
         download_dir: 下载目录
         timeout: 超时时间（秒）
+        driver: Chrome 驱动实例（已开启性能日志）
+        progress_callback: 下载进度回调 progress_callback(received_bytes, total_bytes)
 
     Returns:
         str: 下载完成的文件路径
     """
     start_time = time.time()
+    events_available = driver is not None
+    downloads = {}
+    sizes = {}
+    last_logged = 0.0
+    last_dir_check = 0.0
 
     while time.time() - start_time < timeout:
-        files = os.listdir(download_dir)
-
-        # 过滤掉临时文件
-        completed_files = [
-            f for f in files
-            if not f.endswith('.crdownload')
-            and not f.endswith('.tmp')
-            and not f.startswith('.')
-        ]
-
-        if completed_files:
-            file_path = os.path.join(download_dir, completed_files[0])
-            # 确保文件写入完成
-            time.sleep(0.5)
-            return file_path
-
-        time.sleep(0.5)
+        if events_available:
+            try:
+                events = _read_download_events(driver)
+            except Exception as e:
+                logger.warning(f"[Chrome] 无法读取下载事件，改为检查下载目录: {e}")
+                events_available = False
+                events = []
+
+            for method, params in events:
+                guid = params.get('guid')
+                download = downloads.setdefault(guid, {'filename': None})
+
+                if method.endswith('.downloadWillBegin'):
+                    download['filename'] = params.get('suggestedFilename')
+                    logger.info(f"[Chrome] 开始下载: {download['filename']}")
+                    continue
+
+                state = params.get('state')
+                received = params.get('receivedBytes', 0)
+                total = params.get('totalBytes', 0)
+
+                download['incomplete'] = state == 'inProgress' and 0 < total and received < total
+
+                if progress_callback:
+                    progress_callback(received, total)
+
+                if state == 'inProgress' and time.time() - last_logged >= 1:
+                    last_logged = time.time()
+                    logger.info(f"[Chrome] 下载进度: {received}/{total or '?'} bytes")
+
+                elif state == 'canceled':
+                    raise RuntimeError(f"下载已取消: {download['filename'] or guid}")
+
+                elif state == 'completed':
+                    for name in (guid, download['filename']):
+                        path = os.path.join(download_dir, name) if name else None
+                        if path and os.path.isfile(path):
+                            logger.info(f"[Chrome] 下载完成事件: {received} bytes")
+                            return path
+                    # 文件名无法对应时从目录中查找
+                    for filename in os.listdir(download_dir):
+                        if not is_partial_file(filename):
+                            return os.path.join(download_dir, filename)
+
+        if time.time() - last_dir_check >= DIR_POLL_INTERVAL:
+            last_dir_check = time.time()
+            incomplete = tuple(
+                name
+                for guid, download in downloads.items() if download.get('incomplete')
+                for name in (guid, download['filename']) if name
+            )
+            file_path = _find_completed_file(download_dir, sizes, incomplete)
+            if file_path:
+                return file_path
+
+        time.sleep(EVENT_POLL_INTERVAL)
 
     raise TimeoutError(f"下载超时（{timeout}秒）")
 
 
-def download_pdf_with_chrome(url: str) -> bytes:
+def download_pdf_with_chrome(url: str, download_dir: str) -> str:
     """
     使用 Chrome 浏览器下载 PDF
 
+    从浏览器池借出一个已启动的浏览器，下载到调用方提供的临时目录，
+    完成后清理页面状态并归还浏览器；下载出错的浏览器不再复用。
+
     Args:
         url: PDF 文件的 URL
+        download_dir: 下载目录（由调用方创建和清理）
 
     Returns:
-        bytes: PDF 文件内容
+        str: 下载完成的文件路径
     """
-    # 创建临时下载目录
-    download_dir = tempfile.mkdtemp(prefix='pdf_download_')
-    driver = None
+    with get_driver_pool().lease(discard_on_error=True) as pooled:
+        logger.info(f"[Chrome] 使用池中浏览器，下载目录: {download_dir}")
+        pooled.set_download_dir(download_dir)
 
-    try:
-        logger.info(f"[Chrome] 创建 WebDriver，下载目录: {download_dir}")
-        driver = create_chrome_driver(download_dir)
+        pooled.drain_events()
 
         logger.info(f"[Chrome] 导航到: {url}")
-        driver.get(url)
+        with timing.span('navigate'):
+            pooled.driver.get(url)
 
-        # 等待下载完成
+        # 等待下载完成（根据浏览器的下载事件判断）
         logger.info("[Chrome] 等待下载完成...")
-        file_path = wait_for_download(download_dir)
+        with timing.span('download_wait'):
+            file_path = wait_for_download(download_dir, driver=pooled.driver)
 
         logger.info(f"[Chrome] 下载完成: {file_path}")
+        pooled.reset()
+
+    logger.info(f"[Chrome] 文件大小: {os.path.getsize(file_path)} bytes")
+    return file_path
+
+
+# HTTP直接下载会话（连接池复用）
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """获取HTTP直接下载会话"""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=DIRECT_POOL_SIZE, pool_maxsize=DIRECT_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(DIRECT_HEADERS)
+                _http_session = session
+    return _http_session
 
-        # 读取文件内容
-        with open(file_path, 'rb') as f:
-            content = f.read()
 
-        logger.info(f"[Chrome] 文件大小: {len(content)} bytes")
-        return content
+def download_pdf_direct(url: str, download_dir: str) -> Tuple[str, Dict]:
+    """
+    使用HTTP请求直接下载 PDF，响应内容分块写入文件
+
+    Args:
+        url: PDF 文件的 URL
+        download_dir: 下载目录（由调用方创建和清理）
+
+    Returns:
+        (file_path, validators): 下载完成的文件路径，以及源站返回的 etag / last_modified（用于缓存重新验证）
+
+    Raises:
+        NotPDFError: 响应不是PDF（非200状态、HTML页面或内容不以 %PDF 开头）
+        requests.RequestException: 请求失败
+    """
+    file_path = os.path.join(download_dir, 'direct.pdf')
+
+    try:
+        with get_http_session().get(
+            url,
+            stream=True,
+            timeout=(DIRECT_CONNECT_TIMEOUT, DIRECT_READ_TIMEOUT),
+            allow_redirects=True
+        ) as response:
+            if response.status_code != 200:
+                raise NotPDFError(f"HTTP {response.status_code}")
+
+            content_type = response.headers.get('Content-Type', '')
+            if 'html' in content_type.lower():
+                raise NotPDFError(f"HTML响应 ({content_type})")
+
+            size = 0
+            with open(file_path, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    if not size and not chunk.lstrip().startswith(b'%PDF'):
+                        raise NotPDFError(f"内容不是PDF ({content_type or '未知类型'})")
+                    f.write(chunk)
+                    size += len(chunk)
+
+            if not size:
+                raise NotPDFError("响应为空")
+
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            }
+
+    except Exception:
+        # 删除写了一半的文件，避免干扰随后在同一目录中的浏览器下载
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+    return file_path, validators
+
+
+def revalidate_pdf(url: str, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """
+    向源站发送条件请求，检查缓存的 PDF 是否仍然有效
+
+    Args:
+        url: PDF 文件的 URL
+        etag: 缓存时源站返回的 ETag
+        last_modified: 缓存时源站返回的 Last-Modified
+
+    Returns:
+        bool: 源站返回 304 时为 True；内容已变化或请求失败时为 False
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    if not headers:
+        return False
 
-    finally:
-        if driver:
-            driver.quit()
-        # 清理临时目录
-        if os.path.exists(download_dir):
-            shutil.rmtree(download_dir, ignore_errors=True)
+    try:
+        with get_http_session().get(
+            url,
+            headers=headers,
+            stream=True,
+            timeout=(DIRECT_CONNECT_TIMEOUT, DIRECT_READ_TIMEOUT),
+            allow_redirects=True
+        ) as response:
+            return response.status_code == 304
+    except requests.RequestException as e:
+        logger.info(f"[HTTP] 重新验证失败: {e}")
+        return False
+
+
+class DownloadedPDF:
+    """
+    下载到本地临时目录的 PDF 文件
+
+    响应直接从磁盘发送文件，不把内容读入内存。
+    多个请求共享同一次下载时由 share() 设置引用数，
+    每个使用者发送完成后调用 release()，全部释放后删除临时目录。
+    """
+
+    def __init__(self, path: str, directory: str, tier: str, validators: Optional[Dict] = None):
+        self.path = path
+        self.directory = directory
+        self.tier = tier
+        self.etag = (validators or {}).get('etag')
+        self.last_modified = (validators or {}).get('last_modified')
+        self.sha256 = None
+        self.size = os.path.getsize(path)
+        self._refs = 1
+        self._lock = threading.Lock()
+
+    def share(self, count: int):
+        """设置共享该文件的使用者数量"""
+        with self._lock:
+            self._refs = count
+
+    def release(self):
+        """释放一个使用者，最后一个使用者释放时删除临时目录"""
+        with self._lock:
+            self._refs -= 1
+            remove = self._refs <= 0
+        if remove:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def download_pdf(url: str) -> DownloadedPDF:
+    """
+    分级下载 PDF：先HTTP直接下载，不是PDF或出错时改用 Chrome 浏览器
+
+    Args:
+        url: PDF 文件的 URL
+
+    Returns:
+        DownloadedPDF: 下载到临时目录的文件及实际使用的下载方式（direct / chrome），
+            使用完成后需调用 release()
+    """
+    download_dir = tempfile.mkdtemp(prefix='pdf_download_')
+    try:
+        file_path, tier, validators = _download_to(url, download_dir)
+        return DownloadedPDF(file_path, download_dir, tier, validators)
+    except BaseException:
+        shutil.rmtree(download_dir, ignore_errors=True)
+        raise
+
+
+def _download_to(url: str, download_dir: str) -> Tuple[str, str, Optional[Dict]]:
+    """分级下载到指定目录，返回 (文件路径, 下载方式, 源站缓存验证头)"""
+    escalated = False
+    if PDF_DIRECT_ENABLED:
+        try:
+            with timing.span('direct_download'):
+                file_path, validators = download_pdf_direct(url, download_dir)
+            logger.info(f"[HTTP] 直接下载成功: {os.path.getsize(file_path)} bytes")
+            _count('direct')
+            return file_path, TIER_DIRECT, validators
+        except (NotPDFError, requests.RequestException) as e:
+            logger.info(f"[HTTP] 直接下载不可用，改用浏览器: {e}")
+            escalated = True
+
+    try:
+        file_path = download_pdf_with_chrome(url, download_dir)
+    except Exception:
+        _count('failed')
+        raise
+
+    _count('chrome')
+    if escalated:
+        _count('direct_escalated')
+    return file_path, TIER_CHROME, None
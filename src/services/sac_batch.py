@@ -0,0 +1,437 @@
+"""
+证券从业人员批量查询
+SAC Batch Lookup - 批量按姓名查询完整信息，进度持久化到磁盘，重启后继续执行
+
+- 姓名去重；多个姓名共享的人员UUID在同一批次内只查询一次详情，
+  一个姓名中未缓存的人员详情通过一次并发请求获取
+- 按可用的浏览器会话数并发处理姓名
+- 每完成一个姓名即追加写入 results.ndjson，重启后跳过已完成的姓名
+- 结果可随时以一个NDJSON文件下载
+- 定期扫描目录，接手其他进程退出后留下的未完成批次（平滑重启时旧工作进程晚于新进程退出）
+- 执行出错的批次标记为 failed，进程停止时未完成的批次标记为 interrupted，之后都会继续执行
+
+批次目录结构:
+    <root>/<batch_id>/state.json     批次状态
+    <root>/<batch_id>/names.json     去重后的姓名列表
+    <root>/<batch_id>/results.ndjson 每行一个姓名的完整查询结果
+    <root>/<batch_id>/.lock          执行中的进程持有的文件锁
+"""
+
+import csv
+import fcntl
+import io
+import json
+import os
+import threading
+import time
+import uuid as uuid_lib
+import logging
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 批次状态
+BATCH_RUNNING = 'running'
+BATCH_DONE = 'done'
+BATCH_FAILED = 'failed'
+BATCH_INTERRUPTED = 'interrupted'
+
+# CSV中作为姓名列的表头
+NAME_COLUMNS = ('name', '姓名')
+
+
+def dedupe_names(names: List[str]) -> List[str]:
+    """去除空白和重复的姓名，保持原有顺序"""
+    seen = set()
+    result = []
+    for name in names:
+        name = str(name or '').strip()
+        if name and name not in seen:
+            seen.add(name)
+            result.append(name)
+    return result
+
+
+def parse_names_csv(content: bytes) -> List[str]:
+    """
+    从CSV文件中读取姓名
+
+    表头包含 name 或 姓名 列时读取该列，否则读取第一列。
+    依次尝试 UTF-8 和 GBK 编码。
+    """
+    for encoding in ('utf-8-sig', 'gbk'):
+        try:
+            text = content.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError("无法识别CSV文件编码（支持UTF-8和GBK）")
+
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    for column in NAME_COLUMNS:
+        if column in header:
+            index = header.index(column)
+            return [row[index] for row in rows[1:] if len(row) > index]
+
+    return [row[0] for row in rows]
+
+
+class Batch:
+    """一个批量查询批次"""
+
+    def __init__(self, directory: str, state: Dict, names: List[str]):
+        self.directory = directory
+        self.id = state['batch_id']
+        self.state = state
+        self.names = names
+        self.done_names = set()
+        self.failed = 0
+        self.lock_file = None
+        self._lock = threading.Lock()
+
+    @property
+    def results_path(self) -> str:
+        return os.path.join(self.directory, 'results.ndjson')
+
+    def to_dict(self) -> Dict:
+        """返回批次状态"""
+        with self._lock:
+            return dict(
+                self.state,
+                total=len(self.names),
+                done=len(self.done_names),
+                failed=self.failed,
+                results_url=f"/api/sac/batch/{self.id}/results"
+            )
+
+
+class BatchManager:
+    """批量查询管理器"""
+
+    def __init__(self, root: str, search: Callable[[str], Tuple[Dict, str]],
+                 details: Callable[[List[str]], List[Tuple[Dict, str]]], workers: int = 2):
+        """
+        初始化批量查询管理器
+
+        Args:
+            root: 批次数据目录
+            search: 按姓名查询人员列表的函数，返回 (result, cache_state)
+            details: 按UUID列表批量查询人员详情的函数，返回与UUID顺序一致的 (result, cache_state) 列表
+            workers: 并发处理的姓名数（建议与浏览器会话数一致）
+        """
+        self.root = root
+        self.search = search
+        self.details = details
+        self.workers = workers
+        os.makedirs(root, exist_ok=True)
+
+        self._batches = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sac-batch')
+
+    # ==================== 提交与恢复 ====================
+
+    def submit(self, names: List[str]) -> Batch:
+        """
+        提交批量查询
+
+        Args:
+            names: 姓名列表（会自动去重）
+
+        Returns:
+            Batch: 新建的批次
+        """
+        names = dedupe_names(names)
+        batch_id = uuid_lib.uuid4().hex
+        directory = os.path.join(self.root, batch_id)
+        os.makedirs(directory)
+
+        state = {
+            'batch_id': batch_id,
+            'status': BATCH_RUNNING,
+            'created_at': time.time(),
+            'finished_at': None
+        }
+        self._write_json(os.path.join(directory, 'names.json'), names)
+        self._write_json(os.path.join(directory, 'state.json'), state)
+
+        batch = Batch(directory, state, names)
+        self._start(batch)
+        logger.info(f"[批量查询] 已提交 {batch_id}，共 {len(names)} 个姓名")
+        return batch
+
+    def resume(self) -> int:
+        """
+        继续执行目录中未完成的批次（进程重启后调用）
+
+        Returns:
+            int: 恢复的批次数
+        """
+        resumed = 0
+        for batch_id in sorted(os.listdir(self.root)):
+            with self._lock:
+                current = self._batches.get(batch_id)
+            if current is not None and current.lock_file is not None:
+                continue
+            if self._read_status(batch_id) in (None, BATCH_DONE):
+                continue
+            batch = self._load(batch_id)
+            if batch is None or self._stopping.is_set():
+                continue
+            if self._start(batch):
+                resumed += 1
+                logger.info(f"[批量查询] 恢复 {batch_id}，"
+                            f"已完成 {len(batch.done_names)}/{len(batch.names)}")
+        return resumed
+
+    def watch(self, interval: float = 30):
+        """
+        立即恢复未完成的批次，之后每隔 interval 秒重新扫描一次
+
+        平滑重启时新工作进程先于旧进程启动，旧进程持有的批次在其退出后由扫描接手。
+        """
+        self.resume()
+        if interval <= 0:
+            return
+
+        def loop():
+            while not self._stopping.wait(interval):
+                try:
+                    self.resume()
+                except Exception as e:
+                    logger.warning(f"[批量查询] 扫描未完成的批次失败: {e}")
+
+        threading.Thread(target=loop, daemon=True, name='sac-batch-watch').start()
+
+    def _read_status(self, batch_id: str) -> Optional[str]:
+        """只读取批次状态（扫描时跳过已完成的批次，不读取姓名和结果）"""
+        try:
+            with open(os.path.join(self.root, batch_id, 'state.json'), encoding='utf-8') as f:
+                return json.load(f).get('status')
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _load(self, batch_id: str) -> Optional[Batch]:
+        """从磁盘加载批次"""
+        directory = os.path.join(self.root, batch_id)
+        try:
+            with open(os.path.join(directory, 'state.json'), encoding='utf-8') as f:
+                state = json.load(f)
+            with open(os.path.join(directory, 'names.json'), encoding='utf-8') as f:
+                names = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        batch = Batch(directory, state, names)
+        self._read_progress(batch)
+        return batch
+
+    def _read_progress(self, batch: Batch, repair: bool = False):
+        """
+        读取已完成的姓名
+
+        Args:
+            batch: 批次
+            repair: 是否截掉进程中断时写了一半的最后一行（仅在持有批次文件锁时使用）
+        """
+        if not os.path.exists(batch.results_path):
+            return
+
+        valid_size = 0
+        with open(batch.results_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                batch.done_names.add(record.get('name'))
+                if record.get('error'):
+                    batch.failed += 1
+                valid_size += len(line)
+
+        if repair and os.path.getsize(batch.results_path) != valid_size:
+            with open(batch.results_path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    def _start(self, batch: Batch) -> bool:
+        """获取批次文件锁并开始执行；其他进程正在执行时返回 False"""
+        lock_file = open(os.path.join(batch.directory, '.lock'), 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        batch.lock_file = lock_file
+        with self._lock:
+            self._batches[batch.id] = batch
+        threading.Thread(target=self._run, args=(batch,), daemon=True,
+                         name=f'sac-batch-{batch.id[:8]}').start()
+        return True
+
+    # ==================== 执行 ====================
+
+    def _run(self, batch: Batch):
+        """执行批次：在共享线程池中并发处理尚未完成的姓名，出错时标记为失败"""
+        fetched = {}
+        fetched_lock = threading.Lock()
+        write_lock = threading.Lock()
+
+        def process(index_name):
+            index, name = index_name
+            record = self._query(name, fetched, fetched_lock)
+            record['index'] = index
+            line = json.dumps(record, ensure_ascii=False) + '\n'
+            with write_lock:
+                with open(batch.results_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+                with batch._lock:
+                    batch.done_names.add(name)
+                    if record.get('error'):
+                        batch.failed += 1
+
+        futures = []
+        try:
+            with batch._lock:
+                batch.done_names.clear()
+                batch.failed = 0
+                resumed = batch.state.get('status') != BATCH_RUNNING
+                if resumed:
+                    batch.state.update(status=BATCH_RUNNING, finished_at=None)
+                    batch.state.pop('error', None)
+                state = dict(batch.state)
+            if resumed:
+                self._write_json(os.path.join(batch.directory, 'state.json'), state)
+            self._read_progress(batch, repair=True)
+
+            pending = [
+                (index, name) for index, name in enumerate(batch.names)
+                if name not in batch.done_names
+            ]
+            futures = [self._executor.submit(process, item) for item in pending]
+            for future in futures:
+                future.result()
+
+            self._finish(batch, BATCH_DONE)
+            logger.info(f"[批量查询] {batch.id} 完成，共 {len(batch.names)} 个姓名，失败 {batch.failed}")
+
+        except (Exception, CancelledError) as e:
+            # 取消尚未开始的姓名，等待执行中的姓名写完结果后再释放批次文件锁
+            # （已取消的任务在执行器关闭后不会再被通知，不能用 wait() 等待）
+            for future in futures:
+                if not future.cancel():
+                    try:
+                        future.result()
+                    except (Exception, CancelledError):
+                        pass
+            if self._stopping.is_set():
+                # 进程停止时取消的批次不是失败，下次启动或其他进程扫描时继续执行
+                logger.info(f"[批量查询] {batch.id} 因进程停止中断，"
+                            f"已完成 {len(batch.done_names)}/{len(batch.names)}")
+                status, error = BATCH_INTERRUPTED, None
+            else:
+                logger.error(f"[批量查询] {batch.id} 失败: {e!r}", exc_info=True)
+                status, error = BATCH_FAILED, str(e) or type(e).__name__
+            try:
+                self._finish(batch, status, error=error)
+            except Exception as write_error:
+                logger.error(f"[批量查询] {batch.id} 写入状态失败: {write_error}")
+
+        finally:
+            batch.lock_file.close()
+            batch.lock_file = None
+
+    def _finish(self, batch: Batch, status: str, error: Optional[str] = None):
+        """记录批次结束（或中断）状态"""
+        with batch._lock:
+            batch.state['status'] = status
+            batch.state['finished_at'] = None if status == BATCH_INTERRUPTED else time.time()
+            if error is not None:
+                batch.state['error'] = error
+            else:
+                batch.state.pop('error', None)
+            state = dict(batch.state)
+        self._write_json(os.path.join(batch.directory, 'state.json'), state)
+
+    def _query(self, name: str, fetched: Dict, fetched_lock: threading.Lock) -> Dict:
+        """查询一个姓名的完整信息，批次内共享的UUID只查询一次详情，其余UUID一次并发获取"""
+        try:
+            list_result, _ = self.search(name)
+            if "error" in list_result or not list_result.get('success'):
+                return {
+                    'name': name,
+                    'error': list_result.get('error') or list_result.get('message'),
+                    'persons': []
+                }
+
+            person_list = list_result.get('data', {}).get('data', [])
+            with fetched_lock:
+                missing = list(dict.fromkeys(
+                    person.get('uuid') for person in person_list if person.get('uuid') not in fetched
+                ))
+            if missing:
+                for uuid, (detail_result, _) in zip(missing, self.details(missing)):
+                    if detail_result.get('success'):
+                        with fetched_lock:
+                            fetched[uuid] = detail_result.get('data', {}).get('data', {})
+
+            with fetched_lock:
+                persons = [
+                    {'basic': person, 'detail': fetched.get(person.get('uuid'))}
+                    for person in person_list
+                ]
+
+            return {'name': name, 'total': len(persons), 'persons': persons}
+
+        except Exception as e:
+            logger.error(f"[批量查询] 姓名 {name} 查询失败: {e}")
+            return {'name': name, 'error': str(e), 'persons': []}
+
+    # ==================== 查询与关闭 ====================
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        """查询批次（包括其他进程或之前运行中创建的批次）"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+        if batch is not None:
+            return batch
+        if not batch_id.isalnum():
+            return None
+        return self._load(batch_id)
+
+    def stats(self) -> Dict:
+        """返回当前进程中批次的统计信息"""
+        with self._lock:
+            batches = list(self._batches.values())
+        return {
+            'running': sum(1 for b in batches if b.state.get('status') == BATCH_RUNNING),
+            'done': sum(1 for b in batches if b.state.get('status') == BATCH_DONE),
+            'failed': sum(1 for b in batches if b.state.get('status') == BATCH_FAILED),
+            'interrupted': sum(1 for b in batches if b.state.get('status') == BATCH_INTERRUPTED)
+        }
+
+    def shutdown(self, wait: bool = True):
+        """停止执行和扫描；未完成的批次标记为 interrupted，在下次启动时通过 resume() 继续"""
+        self._stopping.set()
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    @staticmethod
+    def _write_json(path: str, data):
+        """原子写入JSON文件"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
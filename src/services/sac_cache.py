@@ -0,0 +1,245 @@
+"""
+证券从业人员查询结果缓存
+SAC Result Cache - 位于 SACPersonAPI 客户端池之前的查询结果缓存
+
+人员列表和人员详情分别设置缓存时间，只缓存成功的查询结果。
+流式完整查询同样经过缓存：逐批获取未缓存的人员详情，不保留已输出的记录。
+可选的持久化存储（utils.store.ResultStore）让重启后的进程和同机的其他工作进程
+直接使用已有结果。相同键的并发上游请求（包括后台刷新）会被合并为一次。
+"""
+
+import json
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.cache import CACHE_MISS, TTLCache
+from utils.store import ResultStore
+from utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """估算查询结果占用的字节数（按JSON序列化后的长度）"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+    except (TypeError, ValueError):
+        return 1024
+
+
+def is_success(result: Dict) -> bool:
+    """接口返回是否成功"""
+    return isinstance(result, dict) and bool(result.get('success'))
+
+
+def is_complete(result: Dict) -> bool:
+    """完整查询是否成功且所有人员详情均已获取"""
+    return (
+        isinstance(result, dict)
+        and 'error' not in result
+        and all(person.get('detail') is not None for person in result.get('persons', []))
+    )
+
+
+class SACResultCache:
+    """SAC查询结果缓存"""
+
+    def __init__(self, call: Callable[..., Dict], list_ttl: float = 3600,
+                 detail_ttl: float = 86400, stale_ttl: float = 86400,
+                 max_entries: int = 10000, max_bytes: Optional[int] = None,
+                 store: Optional[ResultStore] = None, detail_batch: int = 4):
+        """
+        初始化查询结果缓存
+
+        Args:
+            call: 调用上游的函数，call(method_name, *args) 返回 SACPersonAPI 对应方法的结果
+            list_ttl: 人员列表（含完整查询）的缓存时间（秒）
+            detail_ttl: 人员详情的缓存时间（秒）
+            stale_ttl: 过期后仍可返回旧值并在后台刷新的时间（秒）
+            max_entries: 最大缓存条目数
+            max_bytes: 最大缓存字节数，None 表示不限制
+            store: 持久化存储，None 表示只使用内存缓存
+            detail_batch: 流式完整查询每批获取的人员详情数（每批借用一次客户端）
+        """
+        self.call = call
+        self.list_ttl = list_ttl
+        self.detail_ttl = detail_ttl
+        self.stale_ttl = stale_ttl
+        self.store = store
+        self.detail_batch = max(1, detail_batch)
+        self.flight = SingleFlight(name='sac')
+        self.cache = TTLCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=estimate_size,
+            name='sac',
+            backend=store
+        )
+
+        if store is not None:
+            self.purge_store()
+
+    def purge_store(self) -> int:
+        """删除持久化存储中已超过可用期的结果"""
+        full_ttl = min(self.list_ttl, self.detail_ttl)
+        removed = 0
+        for kind, ttl in (('list', self.list_ttl), ('detail', self.detail_ttl), ('full', full_ttl)):
+            removed += self.store.purge(kind, ttl + self.stale_ttl)
+        if removed:
+            logger.info(f"已清理 {removed} 条过期的持久化结果")
+        return removed
+
+    def _loader(self, key: Tuple[str, str], method: str, *args, **kwargs) -> Callable[[], Dict]:
+        """构造上游加载函数，相同键的并发加载只调用一次上游"""
+        return lambda: self.flight.do(key, lambda: self.call(method, *args, **kwargs))
+
+    def search(self, name: str) -> Tuple[Dict, str]:
+        """
+        按姓名查询人员列表
+
+        Returns:
+            (result, cache_state)
+        """
+        return self.cache.get_or_load(
+            ('list', name),
+            self._loader(('list', name), 'get_person_list_by_name', name),
+            ttl=self.list_ttl,
+            stale_ttl=self.stale_ttl,
+            cacheable=is_success
+        )
+
+    def detail(self, uuid: str) -> Tuple[Dict, str]:
+        """
+        按UUID查询人员详情
+
+        Returns:
+            (result, cache_state)
+        """
+        return self.cache.get_or_load(
+            ('detail', uuid),
+            self._loader(('detail', uuid), 'get_person_detail', uuid),
+            ttl=self.detail_ttl,
+            stale_ttl=self.stale_ttl,
+            cacheable=is_success
+        )
+
+    def details(self, uuids: List[str]) -> List[Tuple[Dict, str]]:
+        """
+        批量查询人员详情：已缓存的直接返回，其余通过一次并发的 get_person_details 获取
+
+        相同的未命中UUID批次并发请求时只调用一次上游。
+
+        Returns:
+            与 uuids 顺序一致的 (result, cache_state) 列表
+        """
+        results: List[Optional[Tuple[Dict, str]]] = [None] * len(uuids)
+        missing = []
+        for index, uuid in enumerate(uuids):
+            key = ('detail', uuid)
+            value, state = self.cache.lookup(
+                key,
+                ttl=self.detail_ttl,
+                stale_ttl=self.stale_ttl,
+                refresh_loader=self._loader(key, 'get_person_detail', uuid),
+                cacheable=is_success
+            )
+            if state == CACHE_MISS:
+                missing.append(index)
+            else:
+                results[index] = (value, state)
+
+        if missing:
+            batch = [uuids[index] for index in missing]
+            fetched = self.flight.do(
+                ('details',) + tuple(batch),
+                lambda: self.call('get_person_details', batch)
+            )
+            for index, value in zip(missing, fetched):
+                if is_success(value):
+                    self.cache.put(('detail', uuids[index]), value, self.detail_ttl, self.stale_ttl)
+                results[index] = (value, CACHE_MISS)
+
+        return results
+
+    def full(self, name: str, progress_callback: Optional[Callable] = None) -> Tuple[Dict, str]:
+        """
+        按姓名查询所有人员的完整信息
+
+        Args:
+            name: 人员姓名
+            progress_callback: 请求上游时的进度回调，见 SACPersonAPI.query_person_full_info；
+                命中缓存、与其他请求合并或后台刷新时不会被调用
+
+        Returns:
+            (result, cache_state)
+        """
+        key = ('full', name)
+        refresh = self._loader(key, 'query_person_full_info', name)
+        loader = self._loader(key, 'query_person_full_info', name,
+                              progress_callback=progress_callback) if progress_callback else refresh
+        return self.cache.get_or_load(
+            key,
+            loader,
+            ttl=min(self.list_ttl, self.detail_ttl),
+            stale_ttl=self.stale_ttl,
+            cacheable=is_complete,
+            refresh_loader=refresh
+        )
+
+    def iter_full(self, name: str) -> Iterator[Tuple[str, Dict]]:
+        """
+        流式完整查询：依次产生 ('meta', ...)、('person', ...)、('end', ...)，失败时产生 ('error', ...)
+
+        完整结果已缓存时直接输出；否则先查询人员列表，再按 detail_batch 逐批获取人员详情，
+        每批借用一次客户端，输出时不占用客户端。每个人员详情单独缓存，
+        输出后不保留记录，内存占用只与批大小有关，与结果总数无关。
+        """
+        key = ('full', name)
+        ttl = min(self.list_ttl, self.detail_ttl)
+        cached, cache_state = self.cache.lookup(
+            key,
+            ttl=ttl,
+            stale_ttl=self.stale_ttl,
+            refresh_loader=self._loader(key, 'query_person_full_info', name),
+            cacheable=is_complete
+        )
+        if cached is not None:
+            yield 'meta', {'name': name, 'total': cached.get('total', 0), 'cache': cache_state}
+            for index, record in enumerate(cached.get('persons', [])):
+                yield 'person', dict(record, index=index)
+            yield 'end', {'name': name, 'total': cached.get('total', 0)}
+            return
+
+        list_result, cache_state = self.search(name)
+        if "error" in list_result or not list_result.get('success'):
+            yield 'error', {'name': name, 'error': list_result.get('error') or list_result.get('message')}
+            return
+
+        person_list = list_result.get('data', {}).get('data', [])
+        yield 'meta', {'name': name, 'total': len(person_list), 'cache': cache_state}
+
+        for start in range(0, len(person_list), self.detail_batch):
+            batch = person_list[start:start + self.detail_batch]
+            detail_results = self.details([person.get('uuid') for person in batch])
+            for offset, (person, (detail_result, _)) in enumerate(zip(batch, detail_results)):
+                yield 'person', {
+                    "basic": person,
+                    "detail": detail_result.get('data', {}).get('data', {}) if is_success(detail_result) else None,
+                    "index": start + offset
+                }
+
+        yield 'end', {'name': name, 'total': len(person_list)}
+
+    def stats(self) -> Dict:
+        """返回缓存统计信息"""
+        stats = self.cache.stats()
+        stats['singleflight'] = self.flight.stats()
+        if self.store is not None:
+            stats['store'] = self.store.stats()
+        return stats
+
+    def close(self):
+        """停止后台刷新并关闭持久化存储"""
+        self.cache.close()
+        if self.store is not None:
+            self.store.close()
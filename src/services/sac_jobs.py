@@ -0,0 +1,294 @@
+"""
+证券从业人员完整查询异步任务
+SAC Full Query Jobs - 提交后立即返回任务ID，后台执行并可轮询进度
+
+完整查询需要先查询列表再逐个获取详情，耗时可能达到数分钟。
+异步任务在后台线程池中执行，轮询时返回进度（已完成/总人数）和已获取的部分结果，
+完成的任务在保留时间后自动清理。
+
+指定任务目录时，任务状态同时写入 <directory>/<job_id>.json（进度最多每秒写一次），
+多进程部署时任意工作进程都能查询其他进程提交的任务。
+执行任务的进程已退出而任务未完成时，查询结果为失败。
+"""
+
+import json
+import os
+import threading
+import time
+import uuid as uuid_lib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+SNAPSHOT_INTERVAL = 1.0  # 执行中写入任务进度的最短间隔（秒）
+
+
+class Job:
+    """一个完整查询任务"""
+
+    def __init__(self, name: str):
+        self.id = uuid_lib.uuid4().hex
+        self.name = name
+        self.status = JOB_PENDING
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.total = None
+        self.done = 0
+        self.records = {}
+        self.result = None
+        self.error = None
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._saved_at = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Job':
+        """从任务状态快照恢复任务（用于读取其他进程写入的任务状态）"""
+        job = cls(data['name'])
+        job.id = data['job_id']
+        job.status = data['status']
+        job.created_at = data.get('created_at')
+        job.started_at = data.get('started_at')
+        job.finished_at = data.get('finished_at')
+        job.total = data.get('progress', {}).get('total')
+        job.done = data.get('progress', {}).get('done', 0)
+        job.result = data.get('result')
+        job.error = data.get('error')
+        job.pid = data.get('pid')
+        job.records = {
+            record['index']: {key: value for key, value in record.items() if key != 'index'}
+            for record in data.get('partial', [])
+        }
+        return job
+
+    def on_progress(self, done: int, total: int, index: Optional[int], record: Optional[Dict]):
+        """完整查询的进度回调（任务结束后忽略）"""
+        with self._lock:
+            if self.status in (JOB_DONE, JOB_FAILED):
+                return
+            self.total = total
+            self.done = done
+            if index is not None:
+                self.records[index] = record
+
+    def to_dict(self) -> Dict:
+        """返回任务状态（完成前包含已获取的部分结果）"""
+        with self._lock:
+            data = {
+                'job_id': self.id,
+                'name': self.name,
+                'status': self.status,
+                'progress': {
+                    'done': self.done,
+                    'total': self.total
+                },
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+            if self.status == JOB_DONE:
+                data['result'] = self.result
+            elif self.status == JOB_FAILED:
+                data['error'] = self.error
+            else:
+                data['partial'] = [
+                    dict(record, index=index)
+                    for index, record in sorted(self.records.items())
+                ]
+            return data
+
+
+class JobManager:
+    """完整查询任务管理器"""
+
+    def __init__(self, run: Callable[[str, Callable], Dict], workers: int = 2,
+                 retention: float = 3600, directory: Optional[str] = None):
+        """
+        初始化任务管理器
+
+        Args:
+            run: 执行完整查询的函数 run(name, progress_callback) -> 完整查询结果
+            workers: 后台执行线程数
+            retention: 完成的任务保留时间（秒）
+            directory: 任务状态目录（多个工作进程共享），None 表示只保存在本进程内存中
+        """
+        self.run = run
+        self.retention = retention
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.purge_directory()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sac-job')
+
+    def submit(self, name: str) -> Job:
+        """
+        提交完整查询任务
+
+        Args:
+            name: 人员姓名
+
+        Returns:
+            Job: 新建的任务
+        """
+        self.purge()
+        job = Job(name)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save(job)
+        self._executor.submit(self._execute, job)
+        logger.info(f"[异步任务] 已提交 {job.id}，姓名: {name}")
+        return job
+
+    def _execute(self, job: Job):
+        """在后台线程中执行任务"""
+        with job._lock:
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+        self._save(job)
+
+        def on_progress(done: int, total: int, index: Optional[int], record: Optional[Dict]):
+            job.on_progress(done, total, index, record)
+            self._save(job, throttle=True)
+
+        try:
+            result = self.run(job.name, on_progress)
+            with job._lock:
+                job.result = result
+                job.total = result.get('total', job.total or 0)
+                job.done = job.total
+                job.status = JOB_DONE
+            logger.info(f"[异步任务] {job.id} 完成，共 {job.total} 个人员")
+
+        except Exception as e:
+            logger.error(f"[异步任务] {job.id} 失败: {e}", exc_info=True)
+            with job._lock:
+                job.error = str(e)
+                job.status = JOB_FAILED
+
+        finally:
+            with job._lock:
+                job.finished_at = time.time()
+                job.records = {}
+            self._save(job)
+
+    def purge_directory(self) -> int:
+        """删除任务目录中超过保留时间未更新的任务状态（包括已退出进程留下的任务）"""
+        deadline = time.time() - self.retention
+        removed = 0
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            try:
+                if os.path.getmtime(path) < deadline:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"[异步任务] 已清理 {removed} 个过期的任务状态")
+        return removed
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _save(self, job: Job, throttle: bool = False):
+        """写入任务状态（throttle 为 True 时距上次写入不足 SNAPSHOT_INTERVAL 秒则跳过）"""
+        if not self.directory:
+            return
+        with job._write_lock:
+            now = time.monotonic()
+            if throttle and now - job._saved_at < SNAPSHOT_INTERVAL:
+                return
+            job._saved_at = now
+            path = self._path(job.id)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(dict(job.to_dict(), pid=job.pid), f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"[异步任务] {job.id} 写入状态失败: {e}")
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        """读取其他进程写入的任务状态"""
+        if not self.directory or not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id), encoding='utf-8') as f:
+                job = Job.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if job.status in (JOB_PENDING, JOB_RUNNING) and not _process_alive(job.pid):
+            job.status = JOB_FAILED
+            job.error = '执行任务的工作进程已退出'
+            job.finished_at = job.finished_at or time.time()
+            job.records = {}
+        elif job.finished_at is not None and job.finished_at < time.time() - self.retention:
+            return None
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """查询任务（包括其他工作进程提交的任务），不存在或已过期时返回 None"""
+        self.purge()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        return self._load(job_id)
+
+    def purge(self) -> int:
+        """清理超过保留时间的已完成任务（只清理本进程的任务，其他进程的任务由其自行清理）"""
+        deadline = time.time() - self.retention
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < deadline
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if self.directory:
+            for job_id in expired:
+                try:
+                    os.remove(self._path(job_id))
+                except OSError:
+                    pass
+        return len(expired)
+
+    def stats(self) -> Dict:
+        """返回任务统计信息"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {JOB_PENDING: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        for job in jobs:
+            counts[job.status] += 1
+        return counts
+
+    def shutdown(self, wait: bool = True):
+        """停止接收新任务，wait 为 True 时等待执行中的任务完成"""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """同一台机器上的进程是否仍在运行"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
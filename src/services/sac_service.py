@@ -6,30 +6,110 @@ SAC (Securities Association of China) Personnel Query Service
 """
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
-from typing import Dict, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 import logging
 
+from utils.rate_limit import TokenBucket
+from utils.metrics import Counter, Histogram
+from utils import timing
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 官网地址（基准测试时可指向本地模拟服务）
+DEFAULT_BASE_URL = "https://gs.sac.net.cn"
+
+# 请求通道
+TRANSPORT_BROWSER = 'browser'  # 在浏览器中执行fetch
+TRANSPORT_HTTP = 'http'  # 复用浏览器cookie，直接发送HTTP请求
+
+HTTP_TIMEOUT = 15  # 直连HTTP请求超时时间（秒）
+HTTP_POOL_SIZE = 10  # 直连HTTP连接池大小
+
+# 模拟真实浏览器的User-Agent（浏览器与直连HTTP保持一致）
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36"
+
+# 直连HTTP时视为反爬虫校验的状态码
+CHALLENGE_STATUS_CODES = (202, 403, 412, 429, 503, 521)
+
+
+class SACChallengeError(Exception):
+    """请求遇到反爬虫校验或非JSON响应"""
+
+
+class SACSessionError(Exception):
+    """浏览器会话已失效（浏览器崩溃、会话过期或无法连接 ChromeDriver），需要重建客户端"""
+
+
+# 运行指标
+UPSTREAM_LATENCY = Histogram(
+    'sac_upstream_request_duration_seconds',
+    '上游接口请求耗时（browser_batch 为一次脚本调用中的多个并发请求）',
+    labels=('interface', 'transport')
+)
+UPSTREAM_ERRORS = Counter(
+    'sac_upstream_errors_total',
+    '上游接口请求错误数',
+    labels=('interface', 'transport', 'reason')
+)
+PACING_WAIT = Histogram(
+    'sac_pacing_wait_seconds',
+    '请求限速等待时间',
+    buckets=(0, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+)
+
+
+def _interface(path: str) -> str:
+    """接口名称（路径最后一段）"""
+    return path.rstrip('/').rsplit('/', 1)[-1]
+
+
+def _is_challenge_message(message: str) -> bool:
+    """浏览器中fetch的错误信息是否表示遇到反爬虫校验（校验状态码，或返回了HTML页面导致JSON解析失败）"""
+    message = str(message)
+    if 'SyntaxError' in message or 'JSON' in message:
+        return True
+    return any(f'HTTP error {code}' in message for code in CHALLENGE_STATUS_CODES)
+
 
 class SACPersonAPI:
     """证券从业人员信息查询API"""
 
-    def __init__(self, headless: bool = True, sleep_time: int = 2):
+    def __init__(self, headless: bool = True, sleep_time: int = 2,
+                 transport: str = TRANSPORT_BROWSER, detail_concurrency: int = 4,
+                 pacer: Optional[TokenBucket] = None, base_url: Optional[str] = None):
         """
         初始化API客户端
 
         Args:
             headless: 是否使用无头模式（不显示浏览器窗口）
-            sleep_time: API请求之间的延迟时间（秒），建议2-3秒
+            sleep_time: API请求之间的最小间隔（秒），建议2-3秒；未指定 pacer 时
+                按此间隔创建令牌桶，0 表示不限速
+            transport: 请求通道，'browser' 在浏览器中执行fetch，
+                'http' 由浏览器通过反爬虫检测后导出cookie直接发送HTTP请求
+            detail_concurrency: 完整查询时并发获取详情的最大请求数
+            pacer: 请求限速令牌桶，多个客户端共享同一个令牌桶时共同遵守一个速率
+            base_url: 官网地址，默认 https://gs.sac.net.cn
         """
-        self.base_url = "https://gs.sac.net.cn"
+        if transport not in (TRANSPORT_BROWSER, TRANSPORT_HTTP):
+            raise ValueError(f"不支持的请求通道: {transport}")
+
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip('/')
         self.driver = None
         self.headless = headless
         self.sleep_time = sleep_time
+        self.transport = transport
+        self.detail_concurrency = max(1, detail_concurrency)
+        if pacer is None and sleep_time > 0:
+            pacer = TokenBucket(rate=1.0 / sleep_time, burst=1)
+        self.pacer = pacer
+        self.http_session = None
         self._init_driver()
 
     def _init_driver(self):
@@ -48,11 +128,11 @@ class SACPersonAPI:
         chrome_options.add_experimental_option('useAutomationExtension', False)
 
         # 设置User-Agent - 模拟真实浏览器
-        user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36"
-        chrome_options.add_argument(f'user-agent={user_agent}')
+        chrome_options.add_argument(f'user-agent={USER_AGENT}')
 
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
+            with timing.span('chrome_launch'):
+                self.driver = webdriver.Chrome(options=chrome_options)
 
             # 隐藏webdriver特征
             self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
@@ -78,13 +158,372 @@ class SACPersonAPI:
             logger.info("  Linux: sudo apt-get install chromium-chromedriver")
             raise
 
-    def _ensure_session_ready(self):
-        """确保会话已经准备好，通过反爬虫检测"""
-        if not self.driver.current_url.startswith(self.base_url):
-            logger.info("初始化会话，访问主页...")
-            self.driver.get(f"{self.base_url}/pages/registration/sac-publicity-name.html")
-            logger.info("等待反爬虫检测...")
-            time.sleep(3)  # 等待JavaScript执行和cookie设置
+    def _ensure_session_ready(self, force: bool = False):
+        """
+        确保会话已经准备好，通过反爬虫检测
+
+        Args:
+            force: 是否强制重新访问主页（反爬虫校验失效时使用）
+        """
+        # 直连模式下cookie已导出，无需再访问浏览器
+        if self.transport == TRANSPORT_HTTP and self.http_session is not None and not force:
+            return
+
+        try:
+            if force or not self.driver.current_url.startswith(self.base_url):
+                with timing.span('session_warmup'):
+                    logger.info("初始化会话，访问主页...")
+                    self.driver.get(self._referer())
+                    logger.info("等待反爬虫检测...")
+                    time.sleep(3)  # 等待JavaScript执行和cookie设置
+
+            if self.transport == TRANSPORT_HTTP:
+                self._export_session()
+        except Exception as e:
+            self._check_session(e)
+            raise
+
+    def is_alive(self) -> bool:
+        """
+        存活检查：浏览器进程、ChromeDriver 和会话都可用时返回 True
+
+        浏览器崩溃、会话过期或 ChromeDriver 退出后，所有浏览器命令都会失败，需要重建客户端。
+        """
+        if self.driver is None:
+            return False
+        try:
+            self.driver.execute_script('return 1')
+            return True
+        except Exception as e:
+            logger.warning(f"浏览器会话存活检查失败: {e}")
+            return False
+
+    def _check_session(self, error: Exception):
+        """浏览器命令失败后检查会话，会话已失效时抛出 SACSessionError"""
+        if not self.is_alive():
+            raise SACSessionError(f"浏览器会话已失效: {error}") from error
+
+    def _referer(self) -> str:
+        """查询页面地址"""
+        return f"{self.base_url}/pages/registration/sac-publicity-name.html"
+
+    def _pace(self) -> float:
+        """发出上游请求前领取令牌，返回等待时间（秒）"""
+        if self.pacer is None:
+            return 0.0
+        waited = self.pacer.acquire()
+        PACING_WAIT.observe(waited)
+        timing.record('pacing', waited)
+        if waited > 0:
+            logger.debug(f"限速等待 {waited:.2f} 秒")
+        return waited
+
+    def _api_headers(self) -> Dict:
+        """API请求头"""
+        return {
+            'Accept': 'application/json, text/javascript, */*; q=0.01',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'X-Requested-With': 'XMLHttpRequest',
+            'Origin': self.base_url,
+            'Referer': self._referer()
+        }
+
+    def _export_session(self):
+        """将浏览器通过反爬虫检测后的cookie导出到直连HTTP会话"""
+        if self.http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({'User-Agent': USER_AGENT})
+            self.http_session = session
+
+        self.http_session.cookies.clear()
+        cookies = self.driver.get_cookies()
+        for cookie in cookies:
+            self.http_session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain'),
+                path=cookie.get('path', '/')
+            )
+        logger.info(f"✓ 已导出 {len(cookies)} 个cookie到直连HTTP会话")
+
+    def _http_post(self, path: str, data: Dict) -> Dict:
+        """
+        通过直连HTTP会话发送请求
+
+        Raises:
+            SACChallengeError: 遇到反爬虫校验或响应不是JSON
+        """
+        interface = _interface(path)
+        started = time.perf_counter()
+        try:
+            response = self.http_session.post(
+                f"{self.base_url}{path}",
+                data=data,
+                headers=self._api_headers(),
+                timeout=HTTP_TIMEOUT
+            )
+        except requests.RequestException:
+            UPSTREAM_ERRORS.inc(interface=interface, transport=TRANSPORT_HTTP, reason='request')
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            UPSTREAM_LATENCY.observe(elapsed, interface=interface, transport=TRANSPORT_HTTP)
+            timing.record('upstream', elapsed)
+
+        try:
+            if response.status_code in CHALLENGE_STATUS_CODES:
+                raise SACChallengeError(f"HTTP {response.status_code}")
+
+            response.raise_for_status()
+
+            try:
+                result = response.json()
+            except ValueError:
+                content_type = response.headers.get('Content-Type', '')
+                raise SACChallengeError(f"非JSON响应 ({content_type})")
+
+            if not isinstance(result, dict):
+                raise SACChallengeError(f"返回结果格式异常: {type(result).__name__}")
+
+        except SACChallengeError:
+            UPSTREAM_ERRORS.inc(interface=interface, transport=TRANSPORT_HTTP, reason='challenge')
+            raise
+        except requests.RequestException:
+            UPSTREAM_ERRORS.inc(interface=interface, transport=TRANSPORT_HTTP, reason='status')
+            raise
+
+        return result
+
+    def _browser_post(self, path: str, data: Dict) -> Dict:
+        """在浏览器中执行fetch请求（复用浏览器的cookie和指纹）"""
+        script = """
+        const [url, headers, params] = arguments;
+        return new Promise((resolve, reject) => {
+            fetch(url, {
+                method: 'POST',
+                headers: headers,
+                body: new URLSearchParams(params).toString()
+            })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('HTTP error ' + response.status);
+                }
+                return response.json();
+            })
+            .then(data => resolve(data))
+            .catch(error => reject(error.toString()));
+        });
+        """
+        params = {key: str(value) for key, value in data.items()}
+        interface = _interface(path)
+        started = time.perf_counter()
+        try:
+            return self.driver.execute_script(
+                script, f"{self.base_url}{path}", self._api_headers(), params
+            )
+        except Exception as e:
+            if not self.is_alive():
+                UPSTREAM_ERRORS.inc(interface=interface, transport=TRANSPORT_BROWSER, reason='session')
+                raise SACSessionError(f"浏览器会话已失效: {e}") from e
+            if _is_challenge_message(e):
+                UPSTREAM_ERRORS.inc(interface=interface, transport=TRANSPORT_BROWSER, reason='challenge')
+                raise SACChallengeError(f"浏览器请求遇到反爬虫校验: {e}") from e
+            UPSTREAM_ERRORS.inc(interface=interface, transport=TRANSPORT_BROWSER, reason='script')
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            UPSTREAM_LATENCY.observe(elapsed, interface=interface, transport=TRANSPORT_BROWSER)
+            timing.record('upstream', elapsed)
+
+    def _browser_post_many(self, path: str, data_list: List[Dict], retry_challenged: bool = True) -> List[Dict]:
+        """
+        在一次浏览器脚本调用中并发执行多个fetch请求，并发数不超过 detail_concurrency
+
+        遇到反爬虫校验的请求在重新访问主页后重试一次（retry_challenged）。
+        """
+        script = """
+        const [url, headers, paramsList, limit, delays] = arguments;
+        return new Promise((resolve) => {
+            const results = new Array(paramsList.length);
+            const start = Date.now();
+            let next = 0;
+            const worker = async () => {
+                while (next < paramsList.length) {
+                    const i = next++;
+                    const wait = delays[i] - (Date.now() - start);
+                    if (wait > 0) {
+                        await new Promise(r => setTimeout(r, wait));
+                    }
+                    try {
+                        const response = await fetch(url, {
+                            method: 'POST',
+                            headers: headers,
+                            body: new URLSearchParams(paramsList[i]).toString()
+                        });
+                        if (!response.ok) {
+                            throw new Error('HTTP error ' + response.status);
+                        }
+                        results[i] = await response.json();
+                    } catch (error) {
+                        results[i] = {error: '请求失败: ' + error.toString()};
+                    }
+                }
+            };
+            const workers = [];
+            for (let w = 0; w < Math.min(limit, paramsList.length); w++) {
+                workers.push(worker());
+            }
+            Promise.all(workers).then(() => resolve(results));
+        });
+        """
+        params_list = [{key: str(value) for key, value in data.items()} for data in data_list]
+
+        # 按令牌桶为每个请求预留发出时间，由页面脚本按时发出
+        delays = [self.pacer.reserve() if self.pacer else 0.0 for _ in data_list]
+        for delay in delays:
+            PACING_WAIT.observe(delay)
+
+        interface = _interface(path)
+        started = time.perf_counter()
+        previous_timeout = None
+        try:
+            # 脚本超时只对本次批量请求放宽，结束后恢复，避免影响该会话之后的单个请求
+            previous_timeout = self.driver.timeouts.script
+            self.driver.set_script_timeout(max(delays) + HTTP_TIMEOUT * len(data_list))
+            results = self.driver.execute_script(
+                script, f"{self.base_url}{path}", self._api_headers(),
+                params_list, self.detail_concurrency, [int(d * 1000) for d in delays]
+            )
+        except Exception as e:
+            if not self.is_alive():
+                UPSTREAM_ERRORS.inc(interface=interface, transport='browser_batch', reason='session')
+                raise SACSessionError(f"浏览器会话已失效: {e}") from e
+            UPSTREAM_ERRORS.inc(interface=interface, transport='browser_batch', reason='script')
+            raise
+        finally:
+            if previous_timeout is not None:
+                try:
+                    self.driver.set_script_timeout(previous_timeout)
+                except Exception as e:
+                    logger.debug(f"恢复脚本超时失败: {e}")
+            # 页面脚本按预留时间发出请求，最长的预留等待计为限速等待，不计入上游耗时
+            paced = max(delays, default=0.0)
+            elapsed = max(time.perf_counter() - started - paced, 0.0)
+            timing.record('pacing', paced)
+            UPSTREAM_LATENCY.observe(elapsed, interface=interface, transport='browser_batch')
+            timing.record('upstream', elapsed)
+
+        failed = sum(1 for result in results or [] if isinstance(result, dict) and 'error' in result)
+        if failed:
+            UPSTREAM_ERRORS.inc(failed, interface=interface, transport='browser_batch', reason='request')
+
+        challenged = [
+            index for index, result in enumerate(results or [])
+            if isinstance(result, dict) and 'error' in result and _is_challenge_message(result['error'])
+        ]
+        if challenged and retry_challenged:
+            logger.warning(f"{len(challenged)} 个浏览器请求遇到反爬虫校验，重新访问主页后重试")
+            self._ensure_session_ready(force=True)
+            retried = self._browser_post_many(path, [data_list[i] for i in challenged], retry_challenged=False)
+            for index, result in zip(challenged, retried):
+                results[index] = result
+        return results
+
+    def _post_api_many(self, path: str, data_list: List[Dict],
+                       on_result: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
+        """
+        并发发送多个API请求，结果顺序与参数顺序一致
+
+        单个请求失败时对应位置返回 {"error": ...}，不影响其他请求。
+
+        Args:
+            path: 接口路径
+            data_list: 每个请求的表单参数
+            on_result: 每个请求完成时的回调 on_result(index, result)；
+                浏览器通道下按 detail_concurrency 分批执行以便及时回调
+
+        Returns:
+            接口返回结果列表
+        """
+        if not data_list:
+            return []
+
+        results = [None] * len(data_list)
+
+        def complete(index: int, result):
+            if not isinstance(result, dict):
+                result = {"error": f"返回结果格式异常: {result}"}
+            results[index] = result
+            if on_result:
+                on_result(index, result)
+
+        if self.transport != TRANSPORT_HTTP:
+            step = self.detail_concurrency if on_result else len(data_list)
+            for start in range(0, len(data_list), step):
+                batch = self._browser_post_many(path, data_list[start:start + step])
+                for offset, result in enumerate(batch):
+                    complete(start + offset, result)
+            return results
+
+        challenged = []
+
+        def fetch(index: int):
+            try:
+                self._pace()
+                result = self._http_post(path, data_list[index])
+            except SACChallengeError:
+                challenged.append(index)
+                return
+            except Exception as e:
+                result = {"error": f"请求失败: {str(e)}"}
+            complete(index, result)
+
+        with ThreadPoolExecutor(max_workers=self.detail_concurrency) as executor:
+            list(executor.map(timing.run_in_context(fetch), range(len(data_list))))
+
+        # 遇到反爬虫校验的请求统一回退到浏览器
+        if challenged:
+            challenged.sort()
+            logger.warning(f"{len(challenged)} 个直连请求遇到反爬虫校验，回退到浏览器")
+            self._ensure_session_ready(force=True)
+            fallback = self._browser_post_many(path, [data_list[i] for i in challenged])
+            for index, result in zip(challenged, fallback):
+                complete(index, result)
+
+        return results
+
+    def _post_api(self, path: str, data: Dict) -> Dict:
+        """
+        发送API请求
+
+        直连模式下优先使用HTTP会话，遇到反爬虫校验或非JSON响应时
+        重新通过浏览器检测，本次请求回退到浏览器执行；
+        浏览器请求遇到反爬虫校验时重新访问主页后重试一次。
+
+        Args:
+            path: 接口路径
+            data: 表单参数
+
+        Returns:
+            接口返回结果
+        """
+        if self.transport == TRANSPORT_HTTP:
+            try:
+                return self._http_post(path, data)
+            except SACChallengeError as e:
+                logger.warning(f"直连请求遇到反爬虫校验，回退到浏览器: {e}")
+                self._ensure_session_ready(force=True)
+
+        try:
+            return self._browser_post(path, data)
+        except SACChallengeError as e:
+            logger.warning(f"浏览器请求遇到反爬虫校验，重新访问主页后重试: {e}")
+            self._ensure_session_ready(force=True)
+            return self._browser_post(path, data)
 
     def get_person_list_by_name(self, name: str, person_type: int = 1) -> Dict:
         """
@@ -103,37 +542,15 @@ class SACPersonAPI:
             # 确保会话已准备
             self._ensure_session_ready()
 
-            # 执行AJAX请求 - 使用浏览器的fetch API
+            # 限速：仅在需要时等待，响应直接返回
+            self._pace()
+
+            # 执行AJAX请求
             logger.info("发送API请求...")
-            script = f"""
-            return new Promise((resolve, reject) => {{
-                fetch('{self.base_url}/publicity/getPersonListByName', {{
-                    method: 'POST',
-                    headers: {{
-                        'Accept': 'application/json, text/javascript, */*; q=0.01',
-                        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                        'Content-Type': 'application/x-www-form-urlencoded',
-                        'X-Requested-With': 'XMLHttpRequest',
-                        'Origin': '{self.base_url}',
-                        'Referer': '{self.base_url}/pages/registration/sac-publicity-name.html'
-                    }},
-                    body: 'name={name}&type={person_type}'
-                }})
-                .then(response => {{
-                    if (!response.ok) {{
-                        throw new Error('HTTP error ' + response.status);
-                    }}
-                    return response.json();
-                }})
-                .then(data => resolve(data))
-                .catch(error => reject(error.toString()));
-            }});
-            """
-
-            result = self.driver.execute_script(script)
-
-            # 添加延迟，避免请求过快
-            time.sleep(self.sleep_time)
+            result = self._post_api('/publicity/getPersonListByName', {
+                'name': name,
+                'type': person_type
+            })
 
             if result and isinstance(result, dict):
                 if result.get('success'):
@@ -146,6 +563,9 @@ class SACPersonAPI:
 
             return result
 
+        except SACSessionError:
+            raise
+
         except Exception as e:
             error_msg = f"请求失败: {str(e)}"
             logger.error(f"✗ {error_msg}")
@@ -167,37 +587,12 @@ class SACPersonAPI:
             # 确保会话已准备
             self._ensure_session_ready()
 
+            # 限速：仅在需要时等待，响应直接返回
+            self._pace()
+
             # 执行AJAX请求
             logger.info("发送API请求...")
-            script = f"""
-            return new Promise((resolve, reject) => {{
-                fetch('{self.base_url}/publicity/getPersonDetail', {{
-                    method: 'POST',
-                    headers: {{
-                        'Accept': 'application/json, text/javascript, */*; q=0.01',
-                        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                        'Content-Type': 'application/x-www-form-urlencoded',
-                        'X-Requested-With': 'XMLHttpRequest',
-                        'Origin': '{self.base_url}',
-                        'Referer': '{self.base_url}/pages/registration/sac-publicity-name.html'
-                    }},
-                    body: 'uuid={uuid}'
-                }})
-                .then(response => {{
-                    if (!response.ok) {{
-                        throw new Error('HTTP error ' + response.status);
-                    }}
-                    return response.json();
-                }})
-                .then(data => resolve(data))
-                .catch(error => reject(error.toString()));
-            }});
-            """
-
-            result = self.driver.execute_script(script)
-
-            # 添加延迟，避免请求过快
-            time.sleep(self.sleep_time)
+            result = self._post_api('/publicity/getPersonDetail', {'uuid': uuid})
 
             if result and isinstance(result, dict):
                 if result.get('success'):
@@ -209,17 +604,72 @@ class SACPersonAPI:
 
             return result
 
+        except SACSessionError:
+            raise
+
         except Exception as e:
             error_msg = f"请求失败: {str(e)}"
             logger.error(f"✗ {error_msg}")
             return {"error": error_msg}
 
-    def query_person_full_info(self, name: str) -> Dict:
+    def get_person_details(self, uuids: List[str],
+                           on_result: Optional[Callable[[int, Dict], None]] = None) -> List[Dict]:
+        """
+        批量获取多个人员的详细信息，并发数不超过 detail_concurrency
+
+        Args:
+            uuids: 人员唯一标识符列表
+            on_result: 每个人员详情返回时的回调 on_result(index, result)
+
+        Returns:
+            与 uuids 顺序一致的详细信息字典列表，单个失败时为 {"error": ...}
+        """
+        if not uuids:
+            return []
+
+        try:
+            logger.info(f"\n[接口2] 批量查询 {len(uuids)} 个UUID，并发数: {self.detail_concurrency}")
+
+            # 确保会话已准备
+            self._ensure_session_ready()
+
+            results = self._post_api_many(
+                '/publicity/getPersonDetail',
+                [{'uuid': uuid} for uuid in uuids],
+                on_result=on_result
+            )
+
+        except SACSessionError:
+            raise
+
+        except Exception as e:
+            error_msg = f"请求失败: {str(e)}"
+            logger.error(f"✗ {error_msg}")
+            results = [{"error": error_msg} for _ in uuids]
+            if on_result:
+                for index, result in enumerate(results):
+                    on_result(index, result)
+            return results
+
+        for uuid, result in zip(uuids, results):
+            if not result.get('success'):
+                logger.warning(f"✗ 查询失败 (UUID: {uuid}): "
+                               f"{result.get('error') or result.get('message', '未知错误')}")
+
+        succeeded = sum(1 for r in results if r.get('success'))
+        logger.info(f"✓ 批量查询完成，成功 {succeeded}/{len(uuids)}")
+        return results
+
+    def query_person_full_info(self, name: str,
+                               progress_callback: Optional[Callable[[int, int, Optional[int], Optional[Dict]], None]] = None) -> Dict:
         """
         完整查询：先通过姓名查询列表，再获取每个人的详细信息
 
         Args:
             name: 人员姓名
+            progress_callback: 进度回调 progress_callback(done, total, index, record)；
+                列表查询完成后以 (0, total, None, None) 调用一次，
+                之后每获取一个人员详情调用一次
 
         Returns:
             完整查询结果
@@ -238,18 +688,26 @@ class SACPersonAPI:
 
         person_list = list_result.get('data', {}).get('data', [])
 
-        # 第二步：查询每个人的详细信息
-        full_info_list = []
-        for i, person in enumerate(person_list, 1):
-            uuid = person.get('uuid')
-            logger.info(f"\n查询第 {i}/{len(person_list)} 个人员的详情 (UUID: {uuid})")
+        # 第二步：并发查询每个人的详细信息（结果顺序与列表一致）
+        full_info_list = [None] * len(person_list)
+        progress = {'done': 0}
+        progress_lock = threading.Lock()
 
-            detail_result = self.get_person_detail(uuid)
-
-            full_info_list.append({
-                "basic": person,  # 接口1的基本信息
+        def on_result(index: int, detail_result: Dict):
+            record = {
+                "basic": person_list[index],  # 接口1的基本信息
                 "detail": detail_result.get('data', {}).get('data', {}) if detail_result.get('success') else None
-            })
+            }
+            full_info_list[index] = record
+            if progress_callback:
+                with progress_lock:
+                    progress['done'] += 1
+                    progress_callback(progress['done'], len(person_list), index, record)
+
+        if progress_callback:
+            progress_callback(0, len(person_list), None, None)
+
+        self.get_person_details([person.get('uuid') for person in person_list], on_result=on_result)
 
         return {
             "name": name,
@@ -259,6 +717,9 @@ class SACPersonAPI:
 
     def close(self):
         """关闭浏览器"""
+        if self.http_session:
+            self.http_session.close()
+            self.http_session = None
         if self.driver:
             self.driver.quit()
             logger.info("\n✓ 浏览器已关闭")
@@ -0,0 +1,249 @@
+"""
+准入控制
+Admission Control - 并发上限 + 有界等待队列
+
+同时执行的操作不超过 limit 个，超出的请求进入等待队列；
+队列已满或排队超时的请求立即被拒绝，并根据观测到的平均执行时间
+估算客户端应在多久之后重试（Retry-After）。
+
+AsyncAdmissionController 是 asyncio 版本，排队的请求只占用协程，不占用线程。
+"""
+
+import asyncio
+import math
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """请求未被接纳（队列已满或排队超时）"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """线程安全的准入控制器"""
+
+    def __init__(self, limit: int, max_queue: int, timeout: float = 60.0,
+                 name: str = 'admission', initial_service_time: float = 10.0,
+                 smoothing: float = 0.2):
+        """
+        初始化准入控制器
+
+        Args:
+            limit: 同时执行的操作数上限
+            max_queue: 等待队列长度上限（0 表示不排队，满额时直接拒绝）
+            timeout: 默认的排队超时时间（秒）
+            name: 名称（用于日志和统计）
+            initial_service_time: 尚无观测数据时假定的执行时间（秒）
+            smoothing: 执行时间指数移动平均的平滑系数
+        """
+        if limit < 1:
+            raise ValueError("并发上限必须大于0")
+
+        self.limit = limit
+        self.max_queue = max(max_queue, 0)
+        self.timeout = timeout
+        self.name = name
+        self.smoothing = smoothing
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queued = 0
+        self._service_time = initial_service_time
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.completed = 0
+        self.max_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _retry_after(self) -> int:
+        """估算队列腾出位置所需的时间（调用方持有锁）"""
+        backlog = self._active + self._queued - self.limit + 1
+        return max(1, math.ceil(self._service_time * max(backlog, 1) / self.limit))
+
+    @contextmanager
+    def admit(self, timeout: Optional[float] = None):
+        """
+        申请执行，必要时排队等待
+
+        Args:
+            timeout: 排队超时时间（秒），默认使用 timeout
+
+        Yields:
+            float: 排队等待的时间（秒）
+
+        Raises:
+            AdmissionRejected: 队列已满或排队超时
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.time()
+        deadline = started + timeout
+
+        with self._cond:
+            if self._active >= self.limit and self._queued >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected(
+                    f"{self.name} 正在执行 {self._active} 个请求，排队 {self._queued} 个，队列已满",
+                    self._retry_after()
+                )
+
+            self._queued += 1
+            self.max_queued = max(self.max_queued, self._queued)
+            try:
+                while self._active >= self.limit:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise AdmissionRejected(
+                            f"{self.name} 排队超时（{timeout}秒）",
+                            self._retry_after()
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._queued -= 1
+
+            self._active += 1
+            self.admitted += 1
+            waited = time.time() - started
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+        if waited > 0.01:
+            logger.info(f"[{self.name}] 排队 {waited:.2f}秒后开始执行")
+
+        began = time.time()
+        try:
+            yield waited
+        finally:
+            elapsed = time.time() - began
+            with self._cond:
+                self._active -= 1
+                self.completed += 1
+                self._service_time += self.smoothing * (elapsed - self._service_time)
+                self._cond.notify()
+
+    def stats(self) -> Dict:
+        """返回准入控制统计信息"""
+        with self._cond:
+            return {
+                'name': self.name,
+                'limit': self.limit,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queued': self._queued,
+                'max_queued': self.max_queued,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'avg_wait': round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+                'max_wait': round(self.max_wait, 3),
+                'service_time': round(self._service_time, 3),
+                'retry_after': self._retry_after(),
+            }
+
+
+class AsyncAdmissionController(AdmissionController):
+    """
+    asyncio 版本的准入控制器（在同一个事件循环中使用）
+
+    排队的请求等待 Future，按先后顺序获得执行名额；执行完成时名额直接交给队首的请求。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiters = deque()
+
+    def _record_admitted(self, started: float) -> float:
+        """记录一次准入（调用方持有锁）"""
+        self.admitted += 1
+        waited = time.time() - started
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    @asynccontextmanager
+    async def admit(self, timeout: Optional[float] = None):
+        """
+        申请执行，必要时以协程方式排队等待
+
+        Args:
+            timeout: 排队超时时间（秒），默认使用 timeout
+
+        Yields:
+            float: 排队等待的时间（秒）
+
+        Raises:
+            AdmissionRejected: 队列已满或排队超时
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.time()
+        waiter = None
+
+        with self._cond:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                waited = self._record_admitted(started)
+            elif self._queued >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected(
+                    f"{self.name} 正在执行 {self._active} 个请求，排队 {self._queued} 个，队列已满",
+                    self._retry_after()
+                )
+            else:
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+                self._queued += 1
+                self.max_queued = max(self.max_queued, self._queued)
+
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                with self._cond:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        self._queued -= 1
+                    elif waiter.done() and not waiter.cancelled():
+                        # 名额已交给本请求，但请求在恢复执行前被取消，转交给下一个
+                        self._handoff()
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timeouts += 1
+                        raise AdmissionRejected(
+                            f"{self.name} 排队超时（{timeout}秒）",
+                            self._retry_after()
+                        ) from None
+                raise
+            with self._cond:
+                waited = self._record_admitted(started)
+
+        began = time.time()
+        try:
+            yield waited
+        finally:
+            elapsed = time.time() - began
+            with self._cond:
+                self.completed += 1
+                self._service_time += self.smoothing * (elapsed - self._service_time)
+                self._handoff()
+
+    def _handoff(self):
+        """把执行名额交给队首仍在等待的请求，没有等待者时释放名额（调用方持有锁）"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            self._queued -= 1
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
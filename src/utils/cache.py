@@ -0,0 +1,313 @@
+"""
+内存结果缓存
+In-Memory TTL/LRU Cache - 带过期时间、容量上限和后台刷新的结果缓存
+
+- 每个条目有新鲜期（ttl）和可过期使用期（stale_ttl）
+- 按条目数和估算字节数限制容量，超出时淘汰最久未使用的条目
+- 条目过期但仍在可过期使用期内时，直接返回旧值并在后台刷新
+- 可选的持久化后端（如 utils.store.ResultStore）作为第二级缓存，
+  内存未命中时从后端读取，加载结果同时写入后端
+"""
+
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 缓存状态
+CACHE_HIT = 'HIT'
+CACHE_STALE = 'STALE'
+CACHE_MISS = 'MISS'
+
+
+class _Entry:
+    """缓存条目"""
+
+    __slots__ = ('value', 'size', 'expires_at', 'stale_until')
+
+    def __init__(self, value: Any, size: int, expires_at: float, stale_until: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """线程安全的 TTL + LRU 缓存"""
+
+    def __init__(self, max_entries: int = 1000, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None,
+                 refresh_workers: int = 2, name: str = 'cache', backend: Any = None):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最大条目数
+            max_bytes: 最大估算字节数，None 表示不限制
+            sizeof: 估算条目大小的函数，默认每个条目计为1
+            refresh_workers: 后台刷新线程数
+            name: 缓存名称（用于日志和统计）
+            backend: 持久化后端，需提供 get(key) -> (value, fetched_at) 和 put(key, value)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 1)
+        self.name = name
+        self.backend = backend
+
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix=f'{name}-refresh'
+        )
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.evictions = 0
+
+    # ==================== 基本操作 ====================
+
+    def get(self, key: Hashable) -> Tuple[Any, str]:
+        """
+        读取缓存
+
+        Returns:
+            (value, state): state 为 HIT / STALE / MISS，MISS 时 value 为 None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, CACHE_MISS
+
+            if now >= entry.stale_until:
+                self._remove(key)
+                self.misses += 1
+                return None, CACHE_MISS
+
+            self._data.move_to_end(key)
+            if now < entry.expires_at:
+                self.hits += 1
+                return entry.value, CACHE_HIT
+
+            self.stale_hits += 1
+            return entry.value, CACHE_STALE
+
+    def get_if_fresh(self, key: Hashable) -> Optional[Any]:
+        """
+        只读取未过期的缓存（不计入未命中，供调用方在回退到 get_or_load 之前快速检查）
+
+        Returns:
+            未过期的缓存值，过期或不存在时返回 None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or now >= entry.expires_at:
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: float, stale_ttl: float = 0, age: float = 0.0):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 新鲜期（秒），小于等于0时不缓存
+            stale_ttl: 过期后仍可返回旧值的时间（秒）
+            age: 值已存在的时间（秒），从持久化后端载入时使用
+        """
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        born = time.time() - max(age, 0.0)
+        entry = _Entry(value, size, born + ttl, born + ttl + max(stale_ttl, 0))
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = entry
+            self._bytes += size
+            self._evict()
+
+    def delete(self, key: Hashable):
+        """删除缓存条目"""
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        """删除条目（调用方持有锁）"""
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        """按LRU淘汰超出容量的条目（调用方持有锁）"""
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key, entry = self._data.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    # ==================== 读穿与后台刷新 ====================
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: float,
+                    stale_ttl: float = 0,
+                    cacheable: Optional[Callable[[Any], bool]] = None,
+                    refresh_loader: Optional[Callable[[], Any]] = None) -> Tuple[Any, str]:
+        """
+        读取缓存，未命中时调用 loader 加载并写入缓存
+
+        条目已过期但仍在可过期使用期内时直接返回旧值，并在后台调用 loader 刷新。
+
+        Args:
+            key: 缓存键
+            loader: 加载函数
+            ttl: 新鲜期（秒）
+            stale_ttl: 过期后仍可返回旧值的时间（秒）
+            cacheable: 判断加载结果是否可以缓存（例如只缓存成功结果）
+            refresh_loader: 后台刷新使用的加载函数，默认为 loader；
+                loader 带有调用方专属的回调时应传入不带回调的版本，避免刷新时调用已返回的调用方
+
+        Returns:
+            (value, state): state 为 HIT / STALE / MISS
+        """
+        value, state = self.lookup(key, ttl, stale_ttl, refresh_loader or loader, cacheable)
+        if state != CACHE_MISS:
+            return value, state
+
+        value = loader()
+        if cacheable is None or cacheable(value):
+            self.put(key, value, ttl, stale_ttl)
+        return value, CACHE_MISS
+
+    def lookup(self, key: Hashable, ttl: float, stale_ttl: float = 0,
+               refresh_loader: Optional[Callable[[], Any]] = None,
+               cacheable: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, str]:
+        """
+        读取内存缓存及持久化后端，不加载（供需要自行批量加载未命中键的调用方使用）
+
+        Args:
+            key: 缓存键
+            ttl: 新鲜期（秒）
+            stale_ttl: 过期后仍可返回旧值的时间（秒）
+            refresh_loader: 条目已过期时用于后台刷新的加载函数，None 表示不刷新
+            cacheable: 判断刷新结果是否可以缓存
+
+        Returns:
+            (value, state): state 为 HIT / STALE / MISS，MISS 时 value 为 None
+        """
+        value, state = self.get(key)
+
+        if state == CACHE_MISS and self.backend is not None:
+            value, state = self._get_backend(key, ttl, stale_ttl)
+
+        if state == CACHE_STALE and refresh_loader is not None:
+            self._schedule_refresh(key, refresh_loader, ttl, stale_ttl, cacheable)
+
+        return value, state
+
+    def _get_backend(self, key, ttl, stale_ttl) -> Tuple[Any, str]:
+        """从持久化后端读取，命中时载入内存"""
+        try:
+            stored = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"[{self.name}] 读取持久化存储失败 {key}: {e}")
+            return None, CACHE_MISS
+
+        if stored is None:
+            return None, CACHE_MISS
+
+        value, fetched_at = stored
+        age = time.time() - fetched_at
+        if age >= ttl + max(stale_ttl, 0):
+            return None, CACHE_MISS
+
+        self.set(key, value, ttl, stale_ttl, age=age)
+        with self._lock:
+            self.backend_hits += 1
+        return value, CACHE_HIT if age < ttl else CACHE_STALE
+
+    def put(self, key: Hashable, value: Any, ttl: float, stale_ttl: float = 0):
+        """写入内存及持久化后端"""
+        self.set(key, value, ttl, stale_ttl)
+        if self.backend is not None and ttl > 0:
+            try:
+                self.backend.put(key, value)
+            except Exception as e:
+                logger.warning(f"[{self.name}] 写入持久化存储失败 {key}: {e}")
+
+    def _schedule_refresh(self, key, loader, ttl, stale_ttl, cacheable):
+        """在后台刷新过期条目（同一个键同时只刷新一次）"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = loader()
+                if cacheable is None or cacheable(value):
+                    self.put(key, value, ttl, stale_ttl)
+            except Exception as e:
+                logger.warning(f"[{self.name}] 后台刷新失败 {key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            self._executor.submit(refresh)
+        except RuntimeError:
+            # 执行器已关闭
+            with self._lock:
+                self._refreshing.discard(key)
+
+    # ==================== 统计与关闭 ====================
+
+    def stats(self) -> Dict:
+        """返回缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            served = self.hits + self.stale_hits + self.backend_hits
+            return {
+                'name': self.name,
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'backend_hits': self.backend_hits,
+                'evictions': self.evictions,
+                'refreshing': len(self._refreshing),
+                'hit_ratio': round(served / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self):
+        """停止后台刷新"""
+        self._executor.shutdown(wait=False)
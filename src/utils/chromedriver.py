@@ -0,0 +1,195 @@
+"""
+ChromeDriver 路径解析
+ChromeDriver Resolver - 进程内只查找一次 ChromeDriver，并把结果记录到磁盘
+
+查找顺序:
+1. 环境变量 CHROMEDRIVER_PATH
+2. 磁盘记录（上次解析的路径，文件仍存在且未变化、Chrome 版本也未变化时直接使用）
+3. webdriver-manager
+4. 系统 PATH 中的 chromedriver
+
+解析结果在进程内缓存，之后创建浏览器时不再做任何文件扫描或版本检查。
+Chrome 自动升级后旧的 ChromeDriver 无法创建会话，调用方应在 SessionNotCreatedException 时
+调用 reset_chromedriver() 后重新解析。
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 解析结果记录文件
+RECORD_PATH = os.environ.get(
+    'CHROMEDRIVER_RECORD',
+    os.path.join(os.path.expanduser('~'), '.cache', 'msintership', 'chromedriver.json')
+)
+
+# 查找 Chrome 浏览器时尝试的命令（环境变量 CHROME_BIN 优先）
+CHROME_COMMANDS = (
+    'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+)
+
+_UNRESOLVED = object()
+_resolved = _UNRESOLVED
+_lock = threading.Lock()
+
+
+def _fingerprint(path: str) -> Dict:
+    """文件指纹，用于判断磁盘记录是否仍然有效"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def get_chromedriver_version(path: str) -> Optional[str]:
+    """读取 ChromeDriver 版本号"""
+    try:
+        output = subprocess.run(
+            [path, '--version'], capture_output=True, text=True, timeout=10
+        ).stdout.strip()
+        return output or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def get_chrome_version() -> Optional[str]:
+    """读取已安装的 Chrome 浏览器版本号，找不到浏览器时返回 None"""
+    for command in filter(None, (os.environ.get('CHROME_BIN'),) + CHROME_COMMANDS):
+        path = shutil.which(command) or (command if os.path.isfile(command) else None)
+        if not path:
+            continue
+        try:
+            output = subprocess.run(
+                [path, '--version'], capture_output=True, text=True, timeout=10
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            continue
+        if output:
+            return output
+    return None
+
+
+def _load_record(chrome_version: Optional[str]) -> Optional[Dict]:
+    """读取磁盘记录，路径不存在、文件已变化或 Chrome 已升级时返回 None"""
+    try:
+        with open(RECORD_PATH, encoding='utf-8') as f:
+            record = json.load(f)
+        path = record.get('path')
+        if not (path and os.path.exists(path) and _fingerprint(path) == record.get('fingerprint')):
+            return None
+        if chrome_version and chrome_version != record.get('chrome_version'):
+            logger.info(f"Chrome 版本已变化（{record.get('chrome_version') or '未知'} → {chrome_version}），"
+                        f"重新解析 ChromeDriver")
+            return None
+        return record
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _save_record(path: str, source: str, chrome_version: Optional[str]):
+    """写入磁盘记录"""
+    record = {
+        'path': path,
+        'version': get_chromedriver_version(path),
+        'chrome_version': chrome_version,
+        'source': source,
+        'fingerprint': _fingerprint(path),
+        'resolved_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    try:
+        os.makedirs(os.path.dirname(RECORD_PATH), exist_ok=True)
+        tmp_path = f"{RECORD_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, RECORD_PATH)
+    except OSError as e:
+        logger.warning(f"写入 ChromeDriver 记录失败: {e}")
+    logger.info(f"ChromeDriver 版本: {record['version'] or '未知'}")
+
+
+def _from_webdriver_manager() -> Optional[str]:
+    """通过 webdriver-manager 获取 ChromeDriver"""
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        wdm_path = ChromeDriverManager().install()
+    except Exception as e:
+        logger.warning(f"webdriver-manager 失败: {e}")
+        return None
+
+    # webdriver-manager 有时返回错误的路径，需要修正
+    if os.path.basename(wdm_path) == 'chromedriver':
+        return wdm_path
+
+    # 查找同目录下的 chromedriver
+    dir_path = os.path.dirname(wdm_path)
+    candidate = os.path.join(dir_path, 'chromedriver')
+    if os.path.exists(candidate):
+        return candidate
+
+    # 尝试父目录
+    candidate = os.path.join(os.path.dirname(dir_path), 'chromedriver')
+    if os.path.exists(candidate):
+        return candidate
+
+    return None
+
+
+def _resolve() -> Optional[str]:
+    """按查找顺序解析 ChromeDriver 路径"""
+    env_path = os.environ.get('CHROMEDRIVER_PATH')
+    if env_path and os.path.exists(env_path):
+        return env_path
+
+    chrome_version = get_chrome_version()
+    record = _load_record(chrome_version)
+    if record:
+        logger.info(f"使用已记录的 ChromeDriver: {record['path']} ({record.get('version') or '未知版本'})")
+        return record['path']
+
+    path = _from_webdriver_manager()
+    if path:
+        _save_record(path, 'webdriver-manager', chrome_version)
+        return path
+
+    path = shutil.which('chromedriver')
+    if path:
+        _save_record(path, 'PATH', chrome_version)
+        return path
+
+    return None
+
+
+def resolve_chromedriver() -> Optional[str]:
+    """
+    获取 ChromeDriver 路径（进程内只解析一次）
+
+    Returns:
+        Optional[str]: ChromeDriver 路径，找不到时返回 None（由 Selenium 自行查找）
+    """
+    global _resolved
+    if _resolved is _UNRESOLVED:
+        with _lock:
+            if _resolved is _UNRESOLVED:
+                started = time.time()
+                _resolved = _resolve()
+                logger.info(f"ChromeDriver 解析完成 ({time.time() - started:.2f}秒): "
+                            f"{_resolved or '使用 Selenium 默认查找'}")
+    return _resolved
+
+
+def reset_chromedriver():
+    """清除进程内缓存和磁盘记录（Chrome 或 ChromeDriver 升级后无法创建会话时使用）"""
+    global _resolved
+    with _lock:
+        _resolved = _UNRESOLVED
+        try:
+            os.remove(RECORD_PATH)
+        except OSError:
+            pass
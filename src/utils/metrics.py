@@ -0,0 +1,222 @@
+"""
+运行指标
+Metrics - Prometheus 文本格式的计数器、仪表和直方图
+
+- Counter: 只增不减的计数（请求数、错误数、字节数）
+- Gauge: 可增可减的当前值；也可以传入回调函数，在输出时读取（资源池、缓存统计）
+- Histogram: 按区间统计的耗时分布，同时输出总和与次数
+
+所有指标注册到全局 REGISTRY，由 /metrics 接口以 Prometheus 文本格式输出。
+多进程部署时每个工作进程各自统计。
+"""
+
+import bisect
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认耗时区间（秒）：覆盖毫秒级缓存命中到分钟级完整查询
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """注册指标，同名指标只保留第一个"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式输出所有指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                logger.warning(f"读取指标 {metric.name} 失败: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    """指标基类"""
+
+    type = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        """
+        Args:
+            name: 指标名称
+            help: 说明
+            labels: 标签名
+            registry: 注册表，None 表示不注册
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, _format_labels(self.labels, key), value) for key, value in items]
+
+
+class Counter(_Metric):
+    """计数器"""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        """增加计数"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """仪表"""
+
+    type = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], Dict[Tuple, float]]] = None,
+                 registry: Optional[Registry] = REGISTRY):
+        """
+        Args:
+            callback: 输出时调用，返回 {标签值元组: 值}；指定后忽略 set/inc
+        """
+        super().__init__(name, help, labels, registry)
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        """设置当前值"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        """增加当前值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        """减少当前值"""
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        if self.callback is None:
+            return super().samples()
+        values = self.callback() or {}
+        return [
+            (self.name, _format_labels(self.labels, key), value)
+            for key, value in sorted(values.items())
+        ]
+
+
+class CallbackCounter(Gauge):
+    """输出时从回调读取的计数器（用于已有统计信息中的累计值）"""
+
+    type = 'counter'
+
+
+class Histogram(_Metric):
+    """直方图"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                 registry: Optional[Registry] = REGISTRY):
+        super().__init__(name, help, labels, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        """记录一次观测值"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """记录代码块的执行时间"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            items = sorted((key, (list(counts), total, count))
+                           for key, (counts, total, count) in self._values.items())
+
+        result = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels + ('le',), key + (_format_value(bound),))
+                result.append((f"{self.name}_bucket", labels, cumulative))
+            labels = _format_labels(self.labels + ('le',), key + ('+Inf',))
+            result.append((f"{self.name}_bucket", labels, count))
+            result.append((f"{self.name}_sum", _format_labels(self.labels, key), total))
+            result.append((f"{self.name}_count", _format_labels(self.labels, key), count))
+        return result
+
+
+def render() -> str:
+    """以 Prometheus 文本格式输出全局注册表中的指标"""
+    return REGISTRY.render()
@@ -0,0 +1,351 @@
+"""
+通用资源池
+Generic Resource Pool - 带借出/归还语义的资源池
+
+用于管理创建代价较高的对象（如 Chrome 浏览器会话），
+支持等待超时、预热、借出前的存活检查以及每个实例的使用统计。
+"""
+
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple, Type, Union
+
+from utils import timing
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(TimeoutError):
+    """在超时时间内没有可用资源"""
+
+
+class PooledResource:
+    """池中的单个资源及其统计信息"""
+
+    def __init__(self, resource_id: int, resource: Any):
+        self.id = resource_id
+        self.resource = resource
+        self.created_at = time.time()
+        self.leases = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.leased_at = None
+        self.last_used = None
+
+    def stats(self) -> Dict:
+        """返回该实例的统计信息"""
+        return {
+            'id': self.id,
+            'busy': self.leased_at is not None,
+            'leases': self.leases,
+            'errors': self.errors,
+            'busy_time': round(self.busy_time, 3),
+            'age': round(time.time() - self.created_at, 1),
+            'last_used': self.last_used,
+        }
+
+
+class ResourcePool:
+    """固定上限的资源池，按需创建、借出后独占使用"""
+
+    def __init__(self, factory: Callable[[], Any], size: int,
+                 closer: Optional[Callable[[Any], None]] = None,
+                 name: str = 'pool', wait_timeout: float = 30.0, min_idle: int = 0,
+                 validator: Optional[Callable[[Any], bool]] = None, validate_idle: float = 30.0):
+        """
+        初始化资源池
+
+        Args:
+            factory: 创建资源的函数
+            size: 资源数量上限
+            closer: 关闭资源的函数
+            name: 资源池名称（用于日志和统计）
+            wait_timeout: 默认的借出等待超时时间（秒）
+            min_idle: 保持的空闲备用资源数，借出或移除资源后在后台补足
+            validator: 存活检查函数，返回 False 或抛出异常时丢弃该资源并重新借出
+            validate_idle: 空闲超过该时间（秒）的资源在借出前执行存活检查
+        """
+        if size < 1:
+            raise ValueError("资源池大小必须大于0")
+
+        self.factory = factory
+        self.size = size
+        self.closer = closer
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self.min_idle = min(min_idle, size)
+        self.validator = validator
+        self.validate_idle = validate_idle
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._items = {}
+        self._creating = 0
+        self._next_id = 1
+        self._closed = False
+        self._waiting = 0
+        self._timeouts = 0
+        self._invalidated = 0
+
+    # ==================== 创建与销毁 ====================
+
+    def _create(self) -> PooledResource:
+        """创建新资源（调用方已预留名额）"""
+        try:
+            resource = self.factory()
+        except Exception:
+            with self._cond:
+                self._creating -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._creating -= 1
+            item = PooledResource(self._next_id, resource)
+            self._next_id += 1
+            self._items[item.id] = item
+
+        logger.info(f"[{self.name}] 创建资源 #{item.id}")
+        return item
+
+    def _destroy(self, item: PooledResource):
+        """关闭资源（不持有锁时调用）"""
+        if self.closer:
+            try:
+                self.closer(item.resource)
+            except Exception as e:
+                logger.warning(f"[{self.name}] 关闭资源 #{item.id} 失败: {e}")
+        logger.info(f"[{self.name}] 移除资源 #{item.id}")
+
+    def _spawn(self, count: int) -> list:
+        """在后台线程中创建资源并放入空闲队列（调用方已预留名额）"""
+        def worker():
+            try:
+                item = self._create()
+            except Exception as e:
+                logger.error(f"[{self.name}] 预创建资源失败: {e}")
+                return
+            self.release(item, returned=False)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(count)]
+        for t in threads:
+            t.start()
+        return threads
+
+    def warm(self, count: Optional[int] = None):
+        """
+        预热资源池，并行创建资源直到达到指定数量
+
+        Args:
+            count: 目标资源数量，默认为资源池大小
+        """
+        target = min(count or self.size, self.size)
+
+        with self._cond:
+            missing = target - len(self._items) - self._creating
+            missing = max(missing, 0)
+            self._creating += missing
+
+        for t in self._spawn(missing):
+            t.join()
+
+    def replenish(self):
+        """
+        在后台补足 min_idle 个空闲备用资源（不等待创建完成），使借出者不必等待资源创建
+
+        借出和丢弃资源后自动调用；创建资源池后调用一次可以在后台预先启动备用资源。
+        """
+        if self.min_idle <= 0:
+            return
+
+        with self._cond:
+            if self._closed:
+                return
+            wanted = self.min_idle - len(self._idle) - self._creating
+            room = self.size - len(self._items) - self._creating
+            missing = max(min(wanted, room), 0)
+            self._creating += missing
+
+        if missing:
+            self._spawn(missing)
+
+    # ==================== 借出与归还 ====================
+
+    def acquire(self, timeout: Optional[float] = None, validate: bool = False) -> PooledResource:
+        """
+        借出一个资源
+
+        空闲超过 validate_idle 的资源先执行存活检查，检查失败的资源被丢弃，
+        改为借出其他空闲资源或新建资源。
+
+        Args:
+            timeout: 等待超时时间（秒），默认使用 wait_timeout
+            validate: 是否不论空闲时间都执行存活检查，用于刚遇到失效资源后的重试
+
+        Returns:
+            PooledResource: 借出的资源
+
+        Raises:
+            PoolTimeoutError: 等待超时
+        """
+        timeout = self.wait_timeout if timeout is None else timeout
+        deadline = time.time() + timeout
+
+        while True:
+            item = self._checkout(timeout, deadline)
+            if self._is_valid(item, force=validate):
+                return item
+            with self._cond:
+                self._invalidated += 1
+            logger.warning(f"[{self.name}] 资源 #{item.id} 存活检查失败，丢弃后重新借出")
+            self.release(item, broken=True, returned=False)
+
+    def _is_valid(self, item: PooledResource, force: bool = False) -> bool:
+        """对空闲较久的资源执行存活检查（force 为 True 时不论空闲时间都检查）"""
+        if self.validator is None:
+            return True
+        if not force and time.time() - (item.last_used or item.created_at) < self.validate_idle:
+            return True
+        try:
+            return bool(self.validator(item.resource))
+        except Exception as e:
+            logger.warning(f"[{self.name}] 资源 #{item.id} 存活检查出错: {e}")
+            return False
+
+    def _checkout(self, timeout: float, deadline: float) -> PooledResource:
+        """从空闲队列取出或新建一个资源，必要时等待"""
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"资源池 {self.name} 已关闭")
+
+                    if self._idle:
+                        item = self._idle.pop()
+                        item.leased_at = time.time()
+                        item.leases += 1
+                        break
+
+                    if len(self._items) + self._creating < self.size:
+                        self._creating += 1
+                        item = None
+                        break
+
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"资源池 {self.name} 等待超时（{timeout}秒），"
+                            f"{self.size} 个资源均在使用中"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+        if item is None:
+            item = self._create()
+            item.leased_at = time.time()
+            item.leases += 1
+
+        self.replenish()
+        return item
+
+    def release(self, item: PooledResource, broken: bool = False, returned: bool = True):
+        """
+        归还资源
+
+        Args:
+            item: 借出的资源
+            broken: 资源是否已损坏（损坏的资源会被关闭并移出资源池）
+            returned: 是否为借出后的归还（用于统计占用时间）
+        """
+        now = time.time()
+        if returned and item.leased_at is not None:
+            item.busy_time += now - item.leased_at
+            item.last_used = now
+        item.leased_at = None
+
+        with self._cond:
+            discard = broken or self._closed
+            if discard:
+                self._items.pop(item.id, None)
+            else:
+                self._idle.append(item)
+            self._cond.notify()
+
+        if discard:
+            self._destroy(item)
+            self.replenish()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None,
+              discard_on_error: Union[bool, Type[Exception], Tuple[Type[Exception], ...]] = False,
+              validate: bool = False):
+        """
+        以上下文管理器方式借出资源
+
+        Args:
+            timeout: 等待超时时间（秒）
+            discard_on_error: 发生异常时是否丢弃该资源；传入异常类型时只在发生这些异常时丢弃
+            validate: 是否不论空闲时间都执行存活检查，见 acquire()
+
+        Yields:
+            借出的资源对象
+        """
+        with timing.span(f'{self.name}_pool_wait'):
+            item = self.acquire(timeout, validate=validate)
+        broken = False
+        try:
+            yield item.resource
+        except Exception as e:
+            item.errors += 1
+            if isinstance(discard_on_error, bool):
+                broken = discard_on_error
+            else:
+                broken = isinstance(e, discard_on_error)
+            raise
+        finally:
+            self.release(item, broken=broken)
+
+    # ==================== 统计与关闭 ====================
+
+    def stats(self) -> Dict:
+        """返回资源池统计信息"""
+        with self._cond:
+            items = list(self._items.values())
+            idle = len(self._idle)
+            waiting = self._waiting
+            timeouts = self._timeouts
+            invalidated = self._invalidated
+            creating = self._creating
+
+        return {
+            'name': self.name,
+            'size': self.size,
+            'min_idle': self.min_idle,
+            'alive': len(items),
+            'idle': idle,
+            'busy': len(items) - idle,
+            'creating': creating,
+            'waiting': waiting,
+            'timeouts': timeouts,
+            'invalidated': invalidated,
+            'instances': [item.stats() for item in sorted(items, key=lambda i: i.id)],
+        }
+
+    def close(self):
+        """关闭资源池，关闭所有空闲资源；借出中的资源在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            for item in idle:
+                self._items.pop(item.id, None)
+            self._cond.notify_all()
+
+        for item in idle:
+            self._destroy(item)
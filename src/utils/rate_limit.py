@@ -0,0 +1,70 @@
+"""
+请求限速
+Token Bucket Rate Limiter - 线程安全的令牌桶
+
+令牌按固定速率补充，最多积累 burst 个。请求在发出前领取令牌，
+令牌不足时只让下一次请求等待，而不是在每次响应之后固定休眠。
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 令牌补充速率（每秒请求数）
+            burst: 令牌桶容量（允许的突发请求数）
+        """
+        if rate <= 0:
+            raise ValueError("rate 必须大于0")
+        if burst < 1:
+            raise ValueError("burst 必须大于等于1")
+
+        self.rate = float(rate)
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 1) -> float:
+        """
+        预留令牌，返回需要等待的时间
+
+        预留立即生效：令牌不足时记为欠额，后续调用按先后顺序排队，
+        调用方需自行等待返回的时间后再发出请求。
+
+        Args:
+            tokens: 需要的令牌数
+
+        Returns:
+            float: 需要等待的时间（秒），0 表示可以立即发出
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        领取令牌，必要时阻塞等待
+
+        Args:
+            tokens: 需要的令牌数
+
+        Returns:
+            float: 实际等待的时间（秒）
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
@@ -0,0 +1,106 @@
+"""
+请求合并
+Single-Flight - 合并并发的相同请求
+
+同一个键同时只执行一次操作，执行期间到达的相同请求等待并共享其结果或异常。
+"""
+
+import threading
+import logging
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """一次正在执行的操作"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """线程安全的请求合并器"""
+
+    def __init__(self, name: str = 'singleflight'):
+        """
+        初始化请求合并器
+
+        Args:
+            name: 名称（用于日志和统计）
+        """
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           share: Optional[Callable[[Any, int], None]] = None) -> Any:
+        """
+        执行操作，相同键的并发调用共享同一次执行
+
+        Args:
+            key: 请求键
+            fn: 实际执行的操作
+            share: 成功后、唤醒等待者之前调用 share(result, callers)，callers 为共享结果的调用数；
+                用于需要引用计数的结果（例如所有调用方都用完后才删除的临时文件）
+
+        Returns:
+            操作结果（所有等待者得到同一个对象）
+
+        Raises:
+            操作抛出的异常会传递给所有等待者
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            logger.debug(f"[{self.name}] 合并请求: {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                callers = call.waiters + 1
+            if share is not None and call.error is None:
+                try:
+                    share(call.result, callers)
+                except BaseException as e:
+                    call.error = e
+            call.done.set()
+
+        if call.error is not None:
+            raise call.error
+
+        return call.result
+
+    def stats(self) -> Dict:
+        """返回统计信息"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+            }
@@ -0,0 +1,142 @@
+"""
+持久化结果存储
+Persistent Result Store - 基于 SQLite (WAL 模式) 的结果存储
+
+- 以 (kind, key) 为主键保存JSON结果及获取时间
+- WAL 模式允许多个进程同时读取，写入通过 busy_timeout 排队
+- 每个线程使用独立连接
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT = 30  # 等待其他进程释放写锁的时间（秒）
+
+
+class ResultStore:
+    """SQLite 结果存储，多进程、多线程安全"""
+
+    def __init__(self, path: str):
+        """
+        初始化结果存储
+
+        Args:
+            path: 数据库文件路径（目录不存在时自动创建）
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_results_fetched ON results (kind, fetched_at)')
+        logger.info(f"✓ 结果存储已打开: {path}")
+
+    def _conn(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT * 1000}')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, key: Tuple[str, str]) -> Optional[Tuple[Any, float]]:
+        """
+        读取结果
+
+        Args:
+            key: (kind, key)
+
+        Returns:
+            (value, fetched_at)，不存在时返回 None
+        """
+        kind, name = key
+        row = self._conn().execute(
+            'SELECT payload, fetched_at FROM results WHERE kind = ? AND key = ?',
+            (kind, str(name))
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, key: Tuple[str, str], value: Any, fetched_at: Optional[float] = None):
+        """
+        写入结果
+
+        Args:
+            key: (kind, key)
+            value: 可JSON序列化的结果
+            fetched_at: 获取时间，默认为当前时间
+        """
+        kind, name = key
+        self._conn().execute(
+            'INSERT OR REPLACE INTO results (kind, key, payload, fetched_at) VALUES (?, ?, ?, ?)',
+            (kind, str(name), json.dumps(value, ensure_ascii=False), fetched_at or time.time())
+        )
+
+    def delete(self, key: Tuple[str, str]):
+        """删除结果"""
+        kind, name = key
+        self._conn().execute('DELETE FROM results WHERE kind = ? AND key = ?', (kind, str(name)))
+
+    def purge(self, kind: str, max_age: float) -> int:
+        """
+        删除超过指定时间的结果
+
+        Args:
+            kind: 结果类别
+            max_age: 最长保留时间（秒）
+
+        Returns:
+            int: 删除的条目数
+        """
+        cursor = self._conn().execute(
+            'DELETE FROM results WHERE kind = ? AND fetched_at < ?',
+            (kind, time.time() - max_age)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """返回各类别的条目数"""
+        rows = self._conn().execute('SELECT kind, COUNT(*) FROM results GROUP BY kind').fetchall()
+        return {
+            'path': self.path,
+            'entries': {kind: count for kind, count in rows},
+        }
+
+    def close(self):
+        """关闭所有连接"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -0,0 +1,108 @@
+"""
+请求分阶段计时
+Request Timing - 记录一次请求中各阶段的耗时
+
+- 请求开始时调用 start()，各阶段用 span(name) 计时，同名阶段累加耗时和次数
+- 当前请求保存在 contextvars 中，服务代码无需传递参数；不在请求中时 span() 不做任何记录
+- 在线程池中执行的阶段需要用 contextvars.copy_context().run 传递当前请求（见 run_in_context）
+- 结果以 Server-Timing 响应头和一行JSON日志输出
+"""
+
+import contextvars
+import json
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 每个请求输出一行JSON的日志记录器
+timing_logger = logging.getLogger('timing')
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """一次请求的各阶段耗时"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        """累加一个阶段的耗时"""
+        with self._lock:
+            total, count = self._spans.get(name, (0.0, 0))
+            self._spans[name] = (total + seconds, count + 1)
+
+    def elapsed(self) -> float:
+        """请求开始至今的时间（秒）"""
+        return time.perf_counter() - self.started
+
+    def spans(self) -> Dict[str, Dict]:
+        """各阶段的耗时（毫秒）和次数"""
+        with self._lock:
+            items = list(self._spans.items())
+        return {name: {'ms': round(total * 1000, 1), 'count': count} for name, (total, count) in items}
+
+    def server_timing(self) -> str:
+        """Server-Timing 响应头的值"""
+        parts = []
+        for name, span in self.spans().items():
+            part = f"{name};dur={span['ms']}"
+            if span['count'] > 1:
+                part += f';desc="{span["count"]}x"'
+            parts.append(part)
+        parts.append(f"total;dur={round(self.elapsed() * 1000, 1)}")
+        return ', '.join(parts)
+
+
+def start() -> contextvars.Token:
+    """开始记录当前请求，返回用于 finish() 的令牌"""
+    return _current.set(RequestTiming())
+
+
+def finish(token: contextvars.Token):
+    """结束记录当前请求"""
+    _current.reset(token)
+
+
+def current() -> Optional[RequestTiming]:
+    """当前请求的计时，不在请求中时返回 None"""
+    return _current.get()
+
+
+def record(name: str, seconds: float):
+    """记录一个已知耗时的阶段（例如限速等待）"""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """记录代码块的耗时"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+
+
+def run_in_context(fn: Callable) -> Callable:
+    """包装函数，使其在其他线程中执行时仍记录到当前请求（每次调用使用独立的上下文副本，可并发调用）"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def log_request(timing: RequestTiming, **fields):
+    """输出一行JSON格式的请求计时日志"""
+    record = dict(fields, total_ms=round(timing.elapsed() * 1000, 1), spans=timing.spans())
+    timing_logger.info(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,17 @@
+"""
+WSGI入口
+WSGI Entry Point - 供 gunicorn 等生产服务器加载
+
+    gunicorn -c gunicorn.conf.py
+
+工作进程级的初始化（浏览器池、未完成的批量查询）由 gunicorn.conf.py 在 fork 之后调用。
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app  # noqa: E402
+
+application = app
@@ -1,5 +1,10 @@
 #!/bin/bash
 # 统一HTTP服务启动脚本
+#
+# 用法: ./start_server.sh [--install] [--dev | --asgi]
+#   默认使用 gunicorn（gthread）启动生产服务，配置见 gunicorn.conf.py
+#   --asgi 使用 uvicorn 启动 asyncio 版本的服务（src/asgi.py）
+#   --dev  使用 Flask 开发服务器（单进程，仅用于调试）
 
 echo "正在启动统一HTTP服务..."
 echo ""
@@ -10,13 +15,29 @@ if ! command -v python3 &> /dev/null; then
     exit 1
 fi
 
+# 解析参数
+INSTALL=0
+MODE=production
+for arg in "$@"; do
+    case "$arg" in
+        --install) INSTALL=1 ;;
+        --dev) MODE=dev ;;
+        --asgi) MODE=asgi ;;
+    esac
+done
+
 # 安装依赖（如果需要）
-if [ "$1" == "--install" ]; then
+if [ "$INSTALL" == "1" ]; then
     echo "安装Python依赖..."
     pip3 install -r requirements.txt
     echo ""
 fi
 
+if [ "$MODE" == "production" ] && ! python3 -c "import gunicorn" &> /dev/null; then
+    echo "警告: 未安装gunicorn，改用开发服务器（pip3 install -r requirements.txt）"
+    MODE=dev
+fi
+
 # 设置端口
 PORT=${PORT:-8888}
 
@@ -37,7 +58,16 @@ if lsof -ti:$PORT > /dev/null 2>&1; then
 fi
 
 # 启动服务
-echo "启动服务，端口: $PORT"
+echo "启动服务，端口: $PORT，模式: $MODE"
 echo ""
 export PORT=$PORT
-python3 src/app.py
+cd "$(dirname "$0")"
+if [ "$MODE" == "production" ]; then
+    exec python3 -m gunicorn -c gunicorn.conf.py
+elif [ "$MODE" == "asgi" ]; then
+    exec python3 -m uvicorn asgi:app --app-dir src --host 0.0.0.0 --port $PORT \
+        --workers ${WEB_CONCURRENCY:-1} --timeout-keep-alive ${GUNICORN_KEEPALIVE:-5} \
+        --timeout-graceful-shutdown ${GUNICORN_GRACEFUL_TIMEOUT:-120}
+else
+    python3 src/app.py
+fi
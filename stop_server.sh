@@ -3,6 +3,18 @@
 
 echo "正在停止服务..."
 
+# 平滑停止gunicorn（等待正在执行的请求完成并关闭浏览器）
+if pkill -TERM -f "gunicorn -c gunicorn.conf.py" 2>/dev/null; then
+    echo "等待gunicorn处理完正在执行的请求..."
+    for _ in $(seq 1 ${GUNICORN_GRACEFUL_TIMEOUT:-120}); do
+        pgrep -f "gunicorn -c gunicorn.conf.py" > /dev/null || break
+        sleep 1
+    done
+fi
+
+# 平滑停止uvicorn
+pkill -TERM -f "uvicorn asgi:app" 2>/dev/null && sleep 1
+
 # 查找并关闭占用端口的进程
 for port in 5000 5001 8888; do
     pid=$(lsof -ti:$port 2>/dev/null)
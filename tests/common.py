@@ -0,0 +1,23 @@
+"""
+测试脚本共用工具
+Shared Helpers - API测试、负载测试和基准测试共用的输出与统计函数
+"""
+
+from typing import List
+
+
+def print_section(title):
+    """打印分隔标题"""
+    print("\n" + "=" * 60)
+    print(f"  {title}")
+    print("=" * 60)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """已排序数据的百分位数（线性插值）"""
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * p / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
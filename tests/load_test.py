@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+负载测试脚本
+Load Test - 按请求组合并发压测统一HTTP服务，输出延迟分位数和错误分类
+
+两种负载模型:
+- closed（闭环）: 固定并发数，每个连接收到响应后立即发送下一个请求，测量服务能支撑的吞吐量
+- open（开环）: 按固定到达速率发送请求（泊松或均匀到达），不因服务变慢而减少请求，
+  测量给定流量下的延迟；延迟从计划发送时间算起，客户端并发已满时记为丢弃
+
+示例:
+    # 闭环：16 个并发，预热 10 秒后测量 60 秒
+    python tests/load_test.py --mode closed --concurrency 16 --warmup 10 --duration 60
+
+    # 开环：每秒 5 个请求，按比例混合四种请求，姓名从文件读取
+    python tests/load_test.py --mode open --rate 5 --mix search=60,detail=25,full=10,pdf=5 --names names.txt
+
+    # 保存JSON报告
+    python tests/load_test.py --duration 30 --json tests/output/load.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from common import percentile, print_section
+
+# 服务器地址
+BASE_URL = os.environ.get('BASE_URL', "http://localhost:8888")
+
+DEFAULT_NAMES = ['张伟', '李明', '王芳', '刘洋', '张丽', '张三']
+DEFAULT_PDF_URLS = ['https://www.w3.org/WAI/ER/tests/xhtml/testfiles/resources/pdf/dummy.pdf']
+
+REQUEST_TYPES = ('search', 'detail', 'full', 'pdf')
+
+# 最多保留的已发现UUID数量（详情请求从中随机选取）
+MAX_KNOWN_UUIDS = 10000
+
+
+def load_lines(path: str) -> List[str]:
+    """读取列表文件：每行一项，忽略空行和 # 开头的注释；CSV 文件取第一列"""
+    items = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            items.append(line.split(',')[0].strip())
+    if not items:
+        raise ValueError(f"文件中没有内容: {path}")
+    return items
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """解析请求组合，如 search=60,detail=25,full=10,pdf=5"""
+    mix = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in REQUEST_TYPES:
+            raise ValueError(f"未知请求类型: {kind}（可选 {', '.join(REQUEST_TYPES)}）")
+        weight = float(weight) if weight else 1.0
+        if weight > 0:
+            mix.append((kind, weight))
+    if not mix:
+        raise ValueError(f"请求组合为空: {spec!r}")
+    return mix
+
+
+class Workload:
+    """按请求组合生成请求，并记录搜索结果中的UUID供详情请求使用"""
+
+    def __init__(self, base_url: str, mix: List[Tuple[str, float]], names: List[str],
+                 pdf_urls: List[str], uuids: Optional[List[str]] = None, seed: Optional[int] = None):
+        self.base_url = base_url.rstrip('/')
+        self.kinds, self.weights = zip(*mix)
+        self.names = names
+        self.pdf_urls = pdf_urls
+        self.uuids = list(uuids or [])
+        self._uuid_set = set(self.uuids)
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def next_request(self) -> Tuple[str, str, Dict]:
+        """随机选取下一个请求，返回 (类型, 路径, 参数)"""
+        with self._lock:
+            kind = self._random.choices(self.kinds, weights=self.weights)[0]
+            if kind == 'detail' and not self.uuids:
+                # 还没有已知的UUID，先发送搜索请求
+                kind = 'search'
+            if kind == 'detail':
+                return kind, '/api/sac/detail', {'uuid': self._random.choice(self.uuids)}
+            if kind == 'pdf':
+                return kind, '/api/pdf/download', {'url': self._random.choice(self.pdf_urls)}
+            name = self._random.choice(self.names)
+        if kind == 'full':
+            return kind, '/api/sac/full', {'name': name}
+        return kind, '/api/sac/search', {'name': name}
+
+    def learn(self, kind: str, response: requests.Response):
+        """从搜索结果中记录UUID"""
+        if kind != 'search' or response.status_code != 200:
+            return
+        try:
+            persons = response.json().get('data', {}).get('data', [])
+        except ValueError:
+            return
+        with self._lock:
+            for person in persons:
+                uuid = person.get('uuid')
+                if uuid and uuid not in self._uuid_set and len(self.uuids) < MAX_KNOWN_UUIDS:
+                    self._uuid_set.add(uuid)
+                    self.uuids.append(uuid)
+
+
+class Recorder:
+    """记录测量窗口内的请求结果"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self.cache = defaultdict(Counter)
+        self.received = Counter()
+        self.dropped = 0
+        self.started = None
+        self.stopped = None
+
+    def record(self, kind: str, latency: float, outcome: str, cache_state: Optional[str] = None, size: int = 0):
+        with self._lock:
+            self.outcomes[kind][outcome] += 1
+            if outcome == 'ok':
+                self.latencies[kind].append(latency)
+                self.received[kind] += size
+            if cache_state:
+                self.cache[kind][cache_state] += 1
+
+    def drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def snapshot(self) -> Tuple[int, int]:
+        """（请求数, 失败数）"""
+        with self._lock:
+            total = sum(sum(counter.values()) for counter in self.outcomes.values())
+            failed = sum(count for counter in self.outcomes.values()
+                         for outcome, count in counter.items() if outcome != 'ok')
+        return total, failed
+
+    def report(self) -> Dict:
+        """汇总报告：各请求类型及总体的吞吐量、延迟分位数、错误分类和缓存状态"""
+        duration = max((self.stopped or time.time()) - (self.started or time.time()), 1e-9)
+
+        def summarize(latencies: List[float], outcomes: Counter, cache: Counter, received: int) -> Dict:
+            values = sorted(latency * 1000 for latency in latencies)
+            total = sum(outcomes.values())
+            ok = outcomes.get('ok', 0)
+            summary = {
+                'requests': total,
+                'ok': ok,
+                'error_rate': round((total - ok) / total, 4) if total else 0.0,
+                'throughput_rps': round(ok / duration, 2),
+                'errors': {outcome: count for outcome, count in outcomes.most_common() if outcome != 'ok'},
+                'cache': dict(cache),
+                'received_bytes': received,
+            }
+            if values:
+                summary['latency_ms'] = {
+                    'p50': round(percentile(values, 50), 1),
+                    'p90': round(percentile(values, 90), 1),
+                    'p95': round(percentile(values, 95), 1),
+                    'p99': round(percentile(values, 99), 1),
+                    'mean': round(sum(values) / len(values), 1),
+                    'max': round(values[-1], 1),
+                }
+            return summary
+
+        with self._lock:
+            by_kind = {
+                kind: summarize(self.latencies[kind], self.outcomes[kind], self.cache[kind], self.received[kind])
+                for kind in REQUEST_TYPES if self.outcomes[kind]
+            }
+            overall = summarize(
+                [latency for values in self.latencies.values() for latency in values],
+                sum(self.outcomes.values(), Counter()),
+                sum(self.cache.values(), Counter()),
+                sum(self.received.values())
+            )
+            dropped = self.dropped
+        return {'duration_s': round(duration, 2), 'dropped': dropped, 'overall': overall, 'by_type': by_kind}
+
+
+class LoadGenerator:
+    """按闭环或开环模型发送请求"""
+
+    def __init__(self, workload: Workload, recorder: Recorder, timeout: float):
+        self.workload = workload
+        self.recorder = recorder
+        self.timeout = timeout
+        self.measure_from = None
+        self.measure_until = None
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _measuring(self, at: float) -> bool:
+        return self.measure_from <= at < self.measure_until
+
+    def send(self, scheduled: Optional[float] = None):
+        """
+        发送一个请求
+
+        Args:
+            scheduled: 开环模型中的计划发送时间，延迟从该时间算起（包含客户端调度延误）
+        """
+        kind, path, params = self.workload.next_request()
+        started = time.time()
+        began = scheduled if scheduled is not None else started
+        cache_state = None
+        size = 0
+        try:
+            response = self._session().get(self.workload.base_url + path, params=params, timeout=self.timeout)
+            size = len(response.content)
+            cache_state = response.headers.get('X-Cache')
+            if response.status_code == 200:
+                outcome = 'ok'
+            else:
+                outcome = f"HTTP {response.status_code}"
+            self.workload.learn(kind, response)
+        except requests.Timeout:
+            outcome = 'timeout'
+        except requests.ConnectionError:
+            outcome = 'connection_error'
+        except requests.RequestException as e:
+            outcome = type(e).__name__
+        latency = time.time() - began
+
+        if self._measuring(began):
+            self.recorder.record(kind, latency, outcome, cache_state, size)
+
+    def run_closed(self, concurrency: int, warmup: float, duration: float):
+        """闭环：concurrency 个连接，每个连接收到响应后立即发送下一个请求"""
+        self.measure_from = time.time() + warmup
+        self.measure_until = self.measure_from + duration
+
+        def worker():
+            while time.time() < self.measure_until:
+                self.send()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        self._wait(threads)
+
+    def run_open(self, rate: float, warmup: float, duration: float, max_in_flight: int, arrival: str):
+        """开环：按到达速率发送请求，同时进行中的请求达到 max_in_flight 时丢弃新请求"""
+        self.measure_from = time.time() + warmup
+        self.measure_until = self.measure_from + duration
+        slots = threading.BoundedSemaphore(max_in_flight)
+        executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='load')
+        rng = random.Random()
+
+        def task(scheduled):
+            try:
+                self.send(scheduled)
+            finally:
+                slots.release()
+
+        def schedule():
+            next_at = time.time()
+            while next_at < self.measure_until:
+                delay = next_at - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                if slots.acquire(blocking=False):
+                    executor.submit(task, next_at)
+                elif self._measuring(next_at):
+                    self.recorder.drop()
+                interval = rng.expovariate(rate) if arrival == 'poisson' else 1.0 / rate
+                next_at += interval
+
+        scheduler = threading.Thread(target=schedule, daemon=True)
+        scheduler.start()
+        self._wait([scheduler])
+        executor.shutdown(wait=True)
+
+    def _wait(self, threads: List[threading.Thread], interval: float = 5.0):
+        """等待结束，期间定期输出进度"""
+        next_report = self.measure_from + interval
+        announced = False
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.2)
+            now = time.time()
+            if not announced and now >= self.measure_from:
+                announced = True
+                print(f"[{time.strftime('%H:%M:%S')}] 预热结束，开始测量")
+            if now >= next_report and now < self.measure_until:
+                next_report += interval
+                total, failed = self.recorder.snapshot()
+                elapsed = now - self.measure_from
+                print(f"[{time.strftime('%H:%M:%S')}] 已测量 {elapsed:.0f}秒，完成 {total} 个请求，"
+                      f"失败 {failed} 个，{total / elapsed:.1f} req/s")
+        self.recorder.started = self.measure_from
+        self.recorder.stopped = min(time.time(), self.measure_until)
+
+
+def print_report(report: Dict, mode: str, offered_rate: Optional[float]):
+    """打印延迟分位数和错误分类"""
+    print_section("测试结果")
+    overall = report['overall']
+    print(f"测量时间: {report['duration_s']}秒")
+    print(f"请求数: {overall['requests']}，成功: {overall['ok']}，错误率: {overall['error_rate'] * 100:.2f}%")
+    if mode == 'open':
+        print(f"到达速率: {offered_rate} req/s，完成速率: {overall['throughput_rps']} req/s，"
+              f"客户端并发已满丢弃: {report['dropped']}")
+    else:
+        print(f"吞吐量: {overall['throughput_rps']} req/s")
+
+    print(f"\n{'类型':<8}{'请求':>7}{'成功':>7}{'req/s':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>10}  (ms)")
+    rows = list(report['by_type'].items()) + [('总计', overall)]
+    for kind, item in rows:
+        latency = item.get('latency_ms', {})
+        print(f"{kind:<8}{item['requests']:>7}{item['ok']:>7}{item['throughput_rps']:>9}"
+              + ''.join(f"{latency.get(key, '-'):>9}" for key in ('p50', 'p90', 'p95', 'p99'))
+              + f"{latency.get('max', '-'):>10}")
+
+    if overall['errors']:
+        print("\n错误分类:")
+        for kind, item in report['by_type'].items():
+            for outcome, count in item['errors'].items():
+                print(f"  {kind:<8}{outcome:<20}{count:>6}")
+
+    caches = {kind: item['cache'] for kind, item in report['by_type'].items() if item['cache']}
+    if caches:
+        print("\n缓存状态 (X-Cache):")
+        for kind, cache in caches.items():
+            print(f"  {kind:<8}" + '，'.join(f"{state} {count}" for state, count in sorted(cache.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='统一HTTP服务负载测试')
+    parser.add_argument('--base-url', default=BASE_URL, help=f'服务器地址（默认 {BASE_URL}，可用环境变量 BASE_URL 设置）')
+    parser.add_argument('--mode', choices=('closed', 'open'), default='closed', help='负载模型：closed 闭环 / open 开环')
+    parser.add_argument('--concurrency', type=int, default=8, help='闭环模型的并发连接数')
+    parser.add_argument('--rate', type=float, default=2.0, help='开环模型的到达速率（每秒请求数）')
+    parser.add_argument('--arrival', choices=('poisson', 'constant'), default='poisson', help='开环模型的到达间隔分布')
+    parser.add_argument('--max-in-flight', type=int, default=256, help='开环模型同时进行中的请求数上限')
+    parser.add_argument('--mix', default='search=60,detail=25,full=10,pdf=5', help='请求组合（类型=权重）')
+    parser.add_argument('--names', help='姓名列表文件（每行一个，CSV取第一列）')
+    parser.add_argument('--uuids', help='UUID列表文件（默认使用搜索结果中的UUID）')
+    parser.add_argument('--pdf-urls', help='PDF URL列表文件')
+    parser.add_argument('--warmup', type=float, default=10, help='预热时间（秒），期间的请求不计入结果')
+    parser.add_argument('--duration', type=float, default=60, help='测量时间（秒）')
+    parser.add_argument('--timeout', type=float, default=300, help='单个请求的超时时间（秒）')
+    parser.add_argument('--seed', type=int, help='请求选择的随机种子（便于复现请求序列）')
+    parser.add_argument('--json', help='保存JSON格式报告的路径')
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+        names = load_lines(args.names) if args.names else DEFAULT_NAMES
+        pdf_urls = load_lines(args.pdf_urls) if args.pdf_urls else DEFAULT_PDF_URLS
+        uuids = load_lines(args.uuids) if args.uuids else None
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.mode == 'closed' and args.concurrency < 1:
+        parser.error('--concurrency 必须大于0')
+    if args.mode == 'open' and (args.rate <= 0 or args.max_in_flight < 1):
+        parser.error('--rate 和 --max-in-flight 必须大于0')
+
+    print_section("统一HTTP服务 - 负载测试")
+    print(f"服务器地址: {args.base_url}")
+    if args.mode == 'closed':
+        print(f"负载模型: 闭环，并发 {args.concurrency}")
+    else:
+        print(f"负载模型: 开环，{args.rate} req/s（{args.arrival}），最多 {args.max_in_flight} 个进行中")
+    print(f"请求组合: {', '.join(f'{kind}={weight:g}' for kind, weight in mix)}")
+    print(f"姓名 {len(names)} 个，PDF {len(pdf_urls)} 个，预热 {args.warmup}秒，测量 {args.duration}秒")
+
+    try:
+        response = requests.get(f"{args.base_url.rstrip('/')}/health", timeout=10)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"\n❌ 服务器未运行或健康检查失败: {e}")
+        sys.exit(1)
+
+    workload = Workload(args.base_url, mix, names, pdf_urls, uuids, args.seed)
+    recorder = Recorder()
+    generator = LoadGenerator(workload, recorder, args.timeout)
+
+    try:
+        if args.mode == 'closed':
+            generator.run_closed(args.concurrency, args.warmup, args.duration)
+        else:
+            generator.run_open(args.rate, args.warmup, args.duration, args.max_in_flight, args.arrival)
+    except KeyboardInterrupt:
+        print("\n测试已中断，输出已完成的请求结果")
+        recorder.started = recorder.started or generator.measure_from
+        recorder.stopped = time.time()
+
+    report = recorder.report()
+    print_report(report, args.mode, args.rate)
+
+    if args.json:
+        report['config'] = {
+            'base_url': args.base_url,
+            'mode': args.mode,
+            'concurrency': args.concurrency if args.mode == 'closed' else None,
+            'rate': args.rate if args.mode == 'open' else None,
+            'arrival': args.arrival if args.mode == 'open' else None,
+            'mix': dict(mix),
+            'names': len(names),
+            'pdf_urls': len(pdf_urls),
+            'warmup_s': args.warmup,
+            'duration_s': args.duration,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n报告已保存到: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,15 +9,10 @@ import json
 import time
 import os
 
-# 服务器地址
-BASE_URL = "http://localhost:8888"
-
+from common import print_section
 
-def print_section(title):
-    """打印分隔标题"""
-    print("\n" + "=" * 60)
-    print(f"  {title}")
-    print("=" * 60)
+# 服务器地址
+BASE_URL = os.environ.get('BASE_URL', "http://localhost:8888")
 
 
 def test_health():